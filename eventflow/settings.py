@@ -89,11 +89,69 @@ WSGI_APPLICATION = 'eventflow.wsgi.application'
 
 ASGI_APPLICATION = 'eventflow.asgi.application'
 
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer",
-    },
-}
+# Channel layer สำหรับแชท เลือกด้วย env CHANNEL_LAYER
+#   memory   → InMemoryChannelLayer (ค่าเริ่มต้น) ใช้ได้เมื่อรัน Daphne process เดียวเท่านั้น
+#   database → mylogin.channel_layer.DatabaseChannelLayer ใช้ DB เดิมเป็นตัวกลาง รันหลาย process ได้โดยไม่ต้องมี service เพิ่ม
+#   redis    → channels_redis (pip install channels-redis) ต่อที่ REDIS_URL
+# วัด latency ของการกระจายข้อความข้าม process ได้ด้วย manage.py bench_channel_layer
+CHANNEL_LAYER = os.environ.get("CHANNEL_LAYER", "memory")
+
+if CHANNEL_LAYER == "database":
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "mylogin.channel_layer.DatabaseChannelLayer",
+            "CONFIG": {
+                "poll_interval": 0.005,
+                "max_poll_interval": 0.05,
+            },
+        },
+    }
+elif CHANNEL_LAYER == "redis":
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {
+                "hosts": [os.environ.get("REDIS_URL", "redis://localhost:6379/0")],
+            },
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+        },
+    }
+
+# Cache (occupancy bitmap รายเดือนของหน้าจอง — mylogin/availability.py) เลือกด้วย env CACHE_BACKEND
+#   locmem   → LocMemCache (ค่าเริ่มต้น) แยกต่อ process: การล้าง cache ตอน booking เปลี่ยนเห็นแค่ process ที่บันทึก
+#              จึงตั้งอายุสั้น (ข้อมูลเก่าค้างใน process อื่นได้ไม่เกิน VENUE_OCCUPANCY_CACHE_TTL วินาที)
+#   database → DatabaseCache ใช้ DB เดิม ใช้ร่วมกันทุก process (ต้องรัน manage.py createcachetable ครั้งแรก)
+#   redis    → RedisCache ของ Django (pip install redis) ต่อที่ REDIS_URL ใช้ร่วมกันทุก process
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "locmem")
+
+if CACHE_BACKEND == "database":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "eventflow_cache",
+        },
+    }
+elif CACHE_BACKEND == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ.get("REDIS_URL", "redis://localhost:6379/0"),
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+    }
+
+# cache ที่ใช้ร่วมกันถูกล้างทันทีเมื่อ booking เปลี่ยน → เก็บนานได้ / locmem ต้องสั้นเพราะ process อื่นไม่ถูกล้าง
+VENUE_OCCUPANCY_CACHE_TTL = 3600 if CACHE_BACKEND in ("database", "redis") else 30
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
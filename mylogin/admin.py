@@ -2,7 +2,7 @@ from django.contrib import admin
 from mylogin.models import CustomUser
 
 admin.site.register(CustomUser)
-from .models import Venue, VenueAmenity, VenueImage
+from .models import BackgroundTask, Venue, VenueAmenity, VenueImage
 
 class VenueAmenityInline(admin.StackedInline):
     model = VenueAmenity
@@ -23,10 +23,17 @@ class VenueAdmin(admin.ModelAdmin):
 
 @admin.register(VenueImage)
 class VenueImageAdmin(admin.ModelAdmin):
-    list_display = ("venue", "order", "image")
+    list_display = ("venue", "order", "image", "processing_status")
     list_editable = ("order",)
+    list_filter = ("processing_status",)
 
 @admin.register(VenueAmenity)
 class VenueAmenityAdmin(admin.ModelAdmin):
     list_display = ("venue", "wifi", "parking", "equipment", "sound_system",
-                    "projector","air_conditioning","seating","drinking_water","first_aid","cctv")
\ No newline at end of file
+                    "projector","air_conditioning","seating","drinking_water","first_aid","cctv")
+
+@admin.register(BackgroundTask)
+class BackgroundTaskAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "attempts", "run_after", "finished_at")
+    list_filter = ("status", "name")
+    readonly_fields = ("created_at", "finished_at", "locked_at", "last_error")
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class MyloginConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'mylogin'
+
+    def ready(self):
+        # ลงทะเบียน signal handlers
+        from mylogin import signals  # noqa: F401
+
+        # ลงทะเบียนงานเบื้องหลัง (manage.py run_worker)
+        from mylogin import image_tasks  # noqa: F401
@@ -0,0 +1,179 @@
+# mylogin/availability.py
+"""
+ตรวจช่วงเวลาว่างของสถานที่
+การจองหนึ่งรายการคือช่วงเวลา start_time–end_time ของทุกวันตั้งแต่ start_date ถึง end_date
+- การจองที่ถูกปฏิเสธ/ยกเลิกแล้วไม่นับว่าช่วงเวลานั้นไม่ว่าง
+- query ทั้งหมดกรองด้วย (venue, status, start_date, end_date) ตรงกับ index booking_availability_idx
+- month_occupancy(): bitmap รายชั่วโมงของทั้งเดือน เก็บใน cache และถูกล้างเมื่อ Booking เปลี่ยน (ดู signals.py)
+  ต้องเป็น cache ที่ใช้ร่วมกันทุก process (CACHE_BACKEND=database/redis) การล้างจึงมีผลกับทุก worker
+  ถ้าเป็น locmem ค่าเริ่มต้น อายุ cache สั้น (ดู VENUE_OCCUPANCY_CACHE_TTL ใน settings)
+"""
+import calendar
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+
+from mylogin.models import Booking, Venue
+
+# สถานะที่ยังถือว่าจองช่วงเวลานั้นอยู่
+ACTIVE_STATUSES = ("pending", "approved", "awaiting_confirmation", "completed")
+
+MINUTES_PER_DAY = 24 * 60
+
+# ช่วงวันที่ยาวที่สุดที่ free_slots รับ (กัน request ขอทั้งปี)
+MAX_RANGE_DAYS = 62
+
+
+def active_bookings(venue, date_from, date_to):
+    """การจองที่ยังมีผล และมีวันใดวันหนึ่งอยู่ในช่วง date_from–date_to"""
+    return Booking.objects.filter(
+        venue=venue,
+        status__in=ACTIVE_STATUSES,
+        start_date__lte=date_to,
+        end_date__gte=date_from,
+    )
+
+
+def overlapping_bookings(venue, start_date, end_date, start_time, end_time, exclude_pk=None):
+    """การจองที่ชนกับช่วงวันที่และช่วงเวลาที่ระบุ (ช่วงเวลาที่ติดกันพอดีไม่นับว่าชน)"""
+    qs = active_bookings(venue, start_date, end_date).filter(
+        start_time__lt=end_time,
+        end_time__gt=start_time,
+    )
+    if exclude_pk is not None:
+        qs = qs.exclude(pk=exclude_pk)
+    return qs
+
+
+def is_available(venue, start_date, end_date, start_time, end_time, exclude_pk=None):
+    return not overlapping_bookings(venue, start_date, end_date, start_time, end_time, exclude_pk).exists()
+
+
+class VenueLocked(Exception):
+    """มี request อื่นกำลังจองสถานที่เดียวกันอยู่"""
+
+
+def lock_venue(venue):
+    """
+    ล็อกแถว Venue (SELECT ... FOR UPDATE NOWAIT) ต้องเรียกภายใน transaction.atomic()
+    ใช้ให้การ "ตรวจว่าง → บันทึกการจอง" ของสถานที่เดียวกันทำทีละ request
+    ถ้ามี request อื่นถือล็อกอยู่จะ raise VenueLocked ทันที (ไม่ต่อคิวรอ)
+    """
+    try:
+        return Venue.objects.select_for_update(nowait=True).only("pk").get(pk=venue.pk)
+    except DatabaseError as exc:
+        raise VenueLocked(venue.pk) from exc
+
+
+def _minutes(t):
+    return t.hour * 60 + t.minute
+
+
+def busy_intervals(venue, date_from, date_to):
+    """
+    คืน {date: [(start_minute, end_minute), ...]} ของช่วงที่ถูกจองในแต่ละวัน (รวมช่วงที่ซ้อน/ติดกันแล้ว)
+    ใช้ query เดียว
+    """
+    rows = active_bookings(venue, date_from, date_to).values_list("start_date", "end_date", "start_time", "end_time")
+
+    busy = {}
+    for start_date, end_date, start_time, end_time in rows:
+        interval = (_minutes(start_time), _minutes(end_time))
+        day = max(start_date, date_from)
+        last = min(end_date, date_to)
+        while day <= last:
+            busy.setdefault(day, []).append(interval)
+            day += timedelta(days=1)
+
+    for day, intervals in busy.items():
+        merged = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        busy[day] = merged
+    return busy
+
+
+def free_slots(venue, date_from, date_to):
+    """
+    คืน [(date, free, busy), ...] ของทุกวันใน date_from–date_to (query เดียว)
+    free/busy เป็นรายการ (start_minute, end_minute) — end_minute สูงสุดคือ 1440 (เที่ยงคืนของวันถัดไป)
+    """
+    if date_to < date_from:
+        raise ValueError("date_to must not be before date_from")
+    if (date_to - date_from).days >= MAX_RANGE_DAYS:
+        raise ValueError(f"date range must be shorter than {MAX_RANGE_DAYS} days")
+
+    busy = busy_intervals(venue, date_from, date_to)
+    days = []
+    day = date_from
+    while day <= date_to:
+        free, cursor = [], 0
+        for start, end in busy.get(day, []):
+            if start > cursor:
+                free.append((cursor, start))
+            cursor = max(cursor, end)
+        if cursor < MINUTES_PER_DAY:
+            free.append((cursor, MINUTES_PER_DAY))
+        days.append((day, free, busy.get(day, [])))
+        day += timedelta(days=1)
+    return days
+
+
+def format_minute(minute):
+    """แปลงนาทีของวันเป็น 'HH:MM' (1440 → '24:00')"""
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+# ========================================
+# Occupancy bitmap รายเดือน (ปฏิทินเลือกวันในหน้าจอง)
+# ========================================
+def _occupancy_cache_key(venue_id, year, month):
+    return f"venue_occupancy:{venue_id}:{year:04d}-{month:02d}"
+
+
+def _hour_bits(start_minute, end_minute):
+    """bit ของชั่วโมงที่ช่วง start–end ครอบอยู่ (ครอบบางส่วนก็นับว่าไม่ว่าง)"""
+    first = start_minute // 60
+    last = (end_minute - 1) // 60
+    return ((1 << (last - first + 1)) - 1) << first if end_minute > start_minute else 0
+
+
+def build_month_occupancy(venue_id, year, month):
+    """
+    คืน list ของ int ยาวเท่าจำนวนวันในเดือน
+    bit ที่ h (0–23) ของแต่ละวันเป็น 1 ถ้าชั่วโมง h:00–h:59 มีการจองอยู่ (query เดียว)
+    """
+    days_in_month = calendar.monthrange(year, month)[1]
+    first_day = date(year, month, 1)
+    busy = busy_intervals(venue_id, first_day, date(year, month, days_in_month))
+
+    bitmaps = [0] * days_in_month
+    for day, intervals in busy.items():
+        for start, end in intervals:
+            bitmaps[day.day - 1] |= _hour_bits(start, end)
+    return bitmaps
+
+
+def month_occupancy(venue_id, year, month):
+    """build_month_occupancy() ผ่าน cache (อายุ VENUE_OCCUPANCY_CACHE_TTL วินาที ค่าเริ่มต้น 30 วินาที)"""
+    key = _occupancy_cache_key(venue_id, year, month)
+    bitmaps = cache.get(key)
+    if bitmaps is None:
+        bitmaps = build_month_occupancy(venue_id, year, month)
+        cache.set(key, bitmaps, getattr(settings, "VENUE_OCCUPANCY_CACHE_TTL", 30))
+    return bitmaps
+
+
+def invalidate_occupancy(venue_id, start_date, end_date):
+    """ล้าง cache ของทุกเดือนที่ช่วง start_date–end_date คาบเกี่ยว"""
+    keys = []
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        keys.append(_occupancy_cache_key(venue_id, year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    cache.delete_many(keys)
@@ -0,0 +1,49 @@
+# mylogin/booking_expiry.py
+"""
+ยกเลิกการจองที่ค้างนานเกินกำหนด (ใช้โดย manage.py expire_bookings)
+- pending ที่เจ้าของไม่ตอบภายใน BOOKING_PENDING_TTL_HOURS ชั่วโมงหลังสร้าง (ค่าเริ่มต้น 48)
+- approved ที่ผู้จองไม่ส่งสลิปภายใน BOOKING_PAYMENT_TTL_HOURS ชั่วโมงหลังอนุมัติ (ค่าเริ่มต้น 24)
+
+ค้นทีละ batch ผ่าน index (status, created_at) / (status, approved_at)
+แล้วเปลี่ยนเป็น cancelled ด้วย Booking.bulk_transition (UPDATE เดียวต่อ batch, signal ปรับตัวนับ/cache ให้)
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from mylogin.models import Booking
+
+
+def pending_ttl():
+    return timedelta(hours=getattr(settings, "BOOKING_PENDING_TTL_HOURS", 48))
+
+
+def payment_ttl():
+    return timedelta(hours=getattr(settings, "BOOKING_PAYMENT_TTL_HOURS", 24))
+
+
+def expiry_rules(now=None):
+    """
+    คืน [(ชื่อ, queryset ของการจองที่หมดอายุ, ฟิลด์ที่ใช้เรียง), ...]
+    การจอง approved รุ่นเก่าที่ไม่มี approved_at นับอายุจาก created_at แทน
+    """
+    now = now or timezone.now()
+    return [
+        ("pending", Booking.objects.filter(status="pending", created_at__lt=now - pending_ttl()), "created_at"),
+        ("approved", Booking.objects.filter(status="approved", approved_at__lt=now - payment_ttl()), "approved_at"),
+        ("approved (ไม่มี approved_at)", Booking.objects.filter(
+            status="approved", approved_at__isnull=True, created_at__lt=now - payment_ttl(),
+        ), "created_at"),
+    ]
+
+
+def expire_batch(queryset, order_field, batch_size):
+    """
+    ยกเลิกการจองใน queryset ไม่เกิน batch_size รายการ (เก่าสุดก่อน) คืน list ของ pk ที่ถูกยกเลิก
+    queryset ถูกส่งต่อให้ bulk_transition ทั้งก้อน → รายการที่สถานะเปลี่ยนไประหว่างนั้น (เช่นเพิ่งได้รับอนุมัติ) จะถูกข้าม
+    """
+    pks = list(queryset.order_by(order_field, "pk").values_list("pk", flat=True)[:batch_size])
+    if not pks:
+        return []
+    return Booking.bulk_transition(queryset.filter(pk__in=pks), "cancelled")
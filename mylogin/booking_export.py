@@ -0,0 +1,90 @@
+# mylogin/booking_export.py
+"""
+ส่งออกรายการจองของเจ้าของสถานที่เป็น CSV แบบ stream (ใช้โดย booking_export_csv)
+- กรองช่วงวันที่/สถานะใน SQL
+- อ่านทีละ chunk ด้วย keyset บน booking_id + values_list → หน่วยความจำคงที่ไม่ว่าจะมีกี่แสนแถว
+  (driver MySQL ดึงผลทั้ง query มาไว้ฝั่ง client จึงไม่พึ่ง .iterator() อย่างเดียว)
+"""
+import csv
+from datetime import datetime
+
+from django.utils import timezone
+
+from mylogin.models import Booking
+
+EXPORT_CHUNK_SIZE = 2000
+
+# (หัวคอลัมน์, ฟิลด์ใน values_list)
+EXPORT_COLUMNS = [
+    ("booking_id", "booking_id"),
+    ("venue", "venue__name"),
+    ("customer_email", "user__email"),
+    ("start_date", "start_date"),
+    ("end_date", "end_date"),
+    ("start_time", "start_time"),
+    ("end_time", "end_time"),
+    ("status", "status"),
+    ("total_price", "total_price"),
+    ("amount_paid", "amount_paid"),
+    ("created_at", "created_at"),
+    ("approved_at", "approved_at"),
+    ("slip_uploaded_at", "slip_uploaded_at"),
+    ("completed_at", "completed_at"),
+    ("rejected_at", "rejected_at"),
+    ("cancelled_at", "cancelled_at"),
+]
+
+_STATUS_LABELS = dict(Booking.STATUS_CHOICES)
+
+
+def owner_export_queryset(owner, date_from=None, date_to=None, statuses=None):
+    """การจองในสถานที่ของ owner ที่มีวันใดวันหนึ่งอยู่ในช่วง date_from–date_to (ไม่ระบุ = ไม่จำกัด)"""
+    qs = Booking.objects.filter(venue__owner=owner)
+    if date_from:
+        qs = qs.filter(end_date__gte=date_from)
+    if date_to:
+        qs = qs.filter(start_date__lte=date_to)
+    if statuses:
+        qs = qs.filter(status__in=statuses)
+    return qs
+
+
+def _format(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        # datetime → เวลาท้องถิ่น (settings.TIME_ZONE) อ่านง่ายใน Excel
+        return timezone.localtime(value).strftime("%Y-%m-%d %H:%M:%S")
+    return value
+
+
+def iter_export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """yield แถว (list) ทีละแถว เริ่มด้วยหัวคอลัมน์"""
+    yield [header for header, _ in EXPORT_COLUMNS]
+
+    fields = [field for _, field in EXPORT_COLUMNS]
+    status_index = fields.index("status")
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(booking_id__gt=last_pk).order_by("booking_id").values_list(*fields)[:chunk_size])
+        if not chunk:
+            return
+        for row in chunk:
+            row = [_format(value) for value in row]
+            row[status_index] = _STATUS_LABELS.get(row[status_index], row[status_index])
+            yield row
+        last_pk = chunk[-1][0]
+
+
+class _Echo:
+    """file-like ที่คืนสิ่งที่เขียนแทนการเก็บไว้ (ให้ csv.writer สร้างทีละบรรทัด)"""
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    """แปลงแถวเป็นบรรทัด CSV (ขึ้นต้นด้วย BOM ให้ Excel อ่านภาษาไทยถูก)"""
+    writer = csv.writer(_Echo())
+    yield "﻿"
+    for row in rows:
+        yield writer.writerow(row)
@@ -0,0 +1,222 @@
+# mylogin/channel_layer.py
+"""
+Channel layer ที่ใช้ฐานข้อมูลของโปรเจกต์เป็นตัวกลาง → รัน Daphne หลาย process/หลายเครื่องได้โดยไม่ต้องมี Redis
+เลือกใช้ใน settings.CHANNEL_LAYERS (ดู eventflow/settings.py)
+
+- channel ของ consumer เป็นแบบเฉพาะ process ("specific.<process>!<สุ่ม>")
+  แต่ละ process มี poller ตัวเดียวคอยดึงข้อความของ inbox ตัวเอง แล้วกระจายให้ consumer ใน process
+  → จำนวน query ไม่ขึ้นกับจำนวน socket
+- group_send เขียนแถวเดียวต่อ process ปลายทาง (ไม่ใช่ต่อ socket) ด้วย INSERT เดียว
+- poller ถี่ขึ้นทันทีเมื่อมีข้อความ และค่อย ๆ ห่างออกจนถึง max_poll_interval เมื่อว่าง
+  → latency ตอนว่างไม่เกิน max_poll_interval, ตอนมีข้อความต่อเนื่องใกล้ poll_interval
+- ไม่จำกัด capacity ของ channel ข้อความที่ไม่มีใครรับจะหมดอายุตาม expiry แล้วถูกลบ
+- ข้อความถูกเก็บเป็น JSON (bytes ถูกแปลงเป็น base64)
+"""
+import asyncio
+import base64
+import json
+import logging
+import time
+import uuid
+from datetime import timedelta
+
+from channels.db import database_sync_to_async
+from channels.layers import BaseChannelLayer
+from django.db import IntegrityError
+from django.utils import timezone
+
+from mylogin.models import ChannelLayerGroup, ChannelLayerMessage
+
+logger = logging.getLogger(__name__)
+
+FETCH_BATCH = 500
+CLEANUP_SECONDS = 30
+
+# poller เจอ error จาก DB → รอนานขึ้นเรื่อย ๆ จนถึงค่านี้ (วินาที) แล้วลองใหม่
+MAX_ERROR_BACKOFF = 5.0
+
+
+def _encode_default(value):
+    if isinstance(value, bytes):
+        return {"__bytes__": base64.b64encode(value).decode()}
+    raise TypeError(f"{type(value).__name__} is not serializable for the channel layer")
+
+
+def _decode_hook(obj):
+    if len(obj) == 1 and "__bytes__" in obj:
+        return base64.b64decode(obj["__bytes__"])
+    return obj
+
+
+def _db(func):
+    # ไม่ผูกกับ thread หลักของ request (thread_sensitive=False) → poll ได้ขนานกับ view อื่น
+    return database_sync_to_async(func, thread_sensitive=False)
+
+
+class DatabaseChannelLayer(BaseChannelLayer):
+    extensions = ["groups", "flush"]
+
+    def __init__(self, expiry=60, group_expiry=86400, capacity=100, channel_capacity=None,
+                 poll_interval=0.005, max_poll_interval=0.05, **kwargs):
+        super().__init__(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity)
+        self.group_expiry = group_expiry
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.client_prefix = uuid.uuid4().hex[:12]
+        self._queues = {}  # channel เฉพาะ process → asyncio.Queue
+        self._poller = None
+        self._last_cleanup = 0.0
+
+    # ========================================
+    # ส่ง
+    # ========================================
+    async def send(self, channel, message):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_channel_name(channel)
+        await _db(self._insert)({self.non_local_name(channel): [channel]}, self._encode(message))
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_group_name(group)
+        await _db(self._group_send)(group, self._encode(message))
+
+    def _group_send(self, group, payload):
+        members = ChannelLayerGroup.objects.filter(group=group, expires_at__gt=timezone.now())
+        by_inbox = {}
+        for channel in members.values_list("channel", flat=True):
+            by_inbox.setdefault(self.non_local_name(channel), []).append(channel)
+        self._insert(by_inbox, payload)
+
+    def _insert(self, by_inbox, payload):
+        if not by_inbox:
+            return
+        expires_at = timezone.now() + timedelta(seconds=self.expiry)
+        ChannelLayerMessage.objects.bulk_create([
+            ChannelLayerMessage(inbox=inbox, channels=channels, payload=payload, expires_at=expires_at)
+            for inbox, channels in by_inbox.items()
+        ])
+
+    # ========================================
+    # รับ
+    # ========================================
+    async def new_channel(self, prefix="specific"):
+        return f"{prefix}.{self.client_prefix}!{uuid.uuid4().hex}"
+
+    async def receive(self, channel):
+        self.require_valid_channel_name(channel)
+        if "!" not in channel:
+            return await self._receive_shared(channel)
+
+        queue = self._queues.setdefault(channel, asyncio.Queue())
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.ensure_future(self._poll_inbox(self.non_local_name(channel)))
+        try:
+            return await queue.get()
+        except asyncio.CancelledError:
+            # consumer ปิดไปแล้ว (disconnect) → เลิกรับของ channel นี้ (ทิ้งข้อความที่ยังค้างในคิวด้วย)
+            self._queues.pop(channel, None)
+            raise
+
+    async def _poll_inbox(self, inbox):
+        interval = self.poll_interval
+        error_backoff = self.max_poll_interval
+        while self._queues:
+            try:
+                rows = await _db(self._fetch)(inbox)
+            except Exception:
+                # เช่น connection หลุด/deadlock → poller ต้องไม่ตาย ไม่งั้น consumer ทุกตัวใน process ค้าง
+                logger.exception("DatabaseChannelLayer: polling inbox %s failed, retry in %.2fs", inbox, error_backoff)
+                await asyncio.sleep(error_backoff)
+                error_backoff = min(error_backoff * 2, MAX_ERROR_BACKOFF)
+                continue
+            error_backoff = self.max_poll_interval
+            if not rows:
+                await asyncio.sleep(interval)
+                interval = min(interval * 2, self.max_poll_interval)
+                continue
+            interval = self.poll_interval
+            for channels, payload in rows:
+                for channel in channels:
+                    queue = self._queues.get(channel)
+                    if queue is not None:
+                        queue.put_nowait(self._decode(payload))
+
+    async def _receive_shared(self, channel):
+        # channel ร่วม (ไม่มี !) อาจมีหลาย process รอรับ → ใครลบแถวได้ก่อนได้ข้อความไป
+        interval = self.poll_interval
+        while True:
+            payload = await _db(self._claim_shared)(channel)
+            if payload is not None:
+                return self._decode(payload)
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, self.max_poll_interval)
+
+    def _fetch(self, inbox):
+        """ดึงและลบข้อความของ inbox เฉพาะ process นี้ (มี process เดียวที่อ่าน inbox นี้จึงไม่ต้องล็อก)"""
+        self._cleanup_expired()
+        rows = list(
+            ChannelLayerMessage.objects.filter(inbox=inbox, expires_at__gt=timezone.now())
+            .order_by("id").values_list("id", "channels", "payload")[:FETCH_BATCH]
+        )
+        if rows:
+            ChannelLayerMessage.objects.filter(id__in=[row[0] for row in rows]).delete()
+        return [(channels, payload) for _, channels, payload in rows]
+
+    def _claim_shared(self, channel):
+        candidates = (
+            ChannelLayerMessage.objects.filter(inbox=channel, expires_at__gt=timezone.now())
+            .order_by("id").values_list("id", "payload")[:10]
+        )
+        for pk, payload in candidates:
+            if ChannelLayerMessage.objects.filter(pk=pk).delete()[0]:
+                return payload
+        return None
+
+    def _cleanup_expired(self):
+        now = time.monotonic()
+        if now - self._last_cleanup < CLEANUP_SECONDS:
+            return
+        self._last_cleanup = now
+        ChannelLayerMessage.objects.filter(expires_at__lte=timezone.now()).delete()
+        ChannelLayerGroup.objects.filter(expires_at__lte=timezone.now()).delete()
+
+    # ========================================
+    # groups / flush
+    # ========================================
+    async def group_add(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        await _db(self._group_add)(group, channel)
+
+    def _group_add(self, group, channel):
+        # UPDATE ก่อน ถ้ายังไม่มีค่อย INSERT (ไม่ใช้ update_or_create ที่ต้องเปิด transaction + SELECT FOR UPDATE)
+        expires_at = timezone.now() + timedelta(seconds=self.group_expiry)
+        if ChannelLayerGroup.objects.filter(group=group, channel=channel).update(expires_at=expires_at):
+            return
+        try:
+            ChannelLayerGroup.objects.create(group=group, channel=channel, expires_at=expires_at)
+        except IntegrityError:
+            # มีอีก request เพิ่มเข้าไปพร้อมกัน
+            ChannelLayerGroup.objects.filter(group=group, channel=channel).update(expires_at=expires_at)
+
+    async def group_discard(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        await _db(ChannelLayerGroup.objects.filter(group=group, channel=channel).delete)()
+
+    async def flush(self):
+        self._queues.clear()
+        await _db(self._flush)()
+
+    def _flush(self):
+        ChannelLayerMessage.objects.all().delete()
+        ChannelLayerGroup.objects.all().delete()
+
+    # ========================================
+    # serialize
+    # ========================================
+    def _encode(self, message):
+        return json.dumps(message, default=_encode_default, ensure_ascii=False)
+
+    def _decode(self, payload):
+        return json.loads(payload, object_hook=_decode_hook)
@@ -0,0 +1,91 @@
+# mylogin/chat.py
+"""
+ข้อมูลแชทที่ใช้ร่วมกันระหว่าง view (ประวัติข้อความแบบ JSON) และ ChatConsumer (WebSocket)
+ประวัติแบ่งหน้าแบบ keyset บน (timestamp, id) ของ thread เดียว ใช้ index chatmsg_thread_ts_idx
+
+สถานะการอ่านเก็บบน ChatThread แยกฝั่ง owner/customer:
+- ข้อความใหม่ → เพิ่ม *_unread_count ของผู้รับ (UPDATE เดียวกับที่อัปเดต updated_at และ last_message)
+  ChatConsumer เขียนผ่าน chat_buffer ซึ่งรวมข้อความของห้องเดียวกันเป็น bulk_create ครั้งเดียว
+- อ่านแล้ว → mark_read() เลื่อน *_last_read_id และนับ unread ใหม่ใน UPDATE เดียว
+  ChatConsumer รวมการอ่านหลายข้อความเป็นครั้งเดียวต่อ READ_RECEIPT_DELAY วินาที
+"""
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from mylogin.models import ChatMessage, ChatThread
+from mylogin.pagination import keyset_page
+
+HISTORY_PAGE_SIZE = 30
+MAX_HISTORY_PAGE_SIZE = 100
+
+# วินาทีที่รอรวม read receipt ก่อนเขียนลง DB
+READ_RECEIPT_DELAY = 1.0
+
+
+def message_payload(message_id, sender_id, content, timestamp):
+    """รูปแบบข้อความที่ส่งให้หน้าเว็บ (เหมือนกันทั้งประวัติและ WebSocket)"""
+    return {
+        "id": message_id,
+        "sender_id": sender_id,
+        "message": content,
+        "sent_at": timestamp.isoformat(),
+        "timestamp": timezone.localtime(timestamp).strftime("%H:%M"),
+    }
+
+
+def history_page(thread_id, cursor=None, limit=HISTORY_PAGE_SIZE):
+    """
+    ข้อความล่าสุด limit ข้อความของ thread (หรือหน้าที่เก่ากว่า cursor) เรียงเก่า → ใหม่ (query เดียว)
+    คืน (list ของ payload, cursor ของหน้าที่เก่ากว่า หรือ None ถ้าไม่มีแล้ว)
+    """
+    limit = max(1, min(limit, MAX_HISTORY_PAGE_SIZE))
+    queryset = ChatMessage.objects.filter(thread_id=thread_id).only("id", "sender_id", "content", "timestamp")
+    page = keyset_page(queryset, limit, after=cursor, time_field="timestamp")
+    messages = [message_payload(m.pk, m.sender_id, m.content, m.timestamp) for m in reversed(page.object_list)]
+    return messages, page.next_cursor
+
+
+# ========================================
+# สถานะการอ่าน
+# ========================================
+def read_fields(is_owner):
+    """(ฟิลด์ last_read_id, ฟิลด์ unread_count) ของฝั่งที่ระบุ"""
+    side = "owner" if is_owner else "customer"
+    return f"{side}_last_read_id", f"{side}_unread_count"
+
+
+def record_messages(thread_id, messages, owner_sent):
+    """
+    ข้อความใหม่ (หลายข้อความพร้อมกันได้ เรียงเก่า → ใหม่) → อัปเดตเวลาล่าสุด/ข้อความล่าสุดของห้อง
+    + เพิ่ม unread ของผู้รับแต่ละฝั่ง ใน UPDATE เดียว
+    owner_sent: จำนวนข้อความในชุดนี้ที่ owner เป็นคนส่ง (ที่เหลือ customer ส่ง)
+    """
+    last = messages[-1]
+    counts = {"customer_unread_count": owner_sent, "owner_unread_count": len(messages) - owner_sent}
+    return ChatThread.objects.filter(pk=thread_id).update(
+        updated_at=last.timestamp,
+        last_message_id=last.pk,
+        **{field: F(field) + n for field, n in counts.items() if n},
+    )
+
+
+def mark_read(thread_id, reader_is_owner, message_id):
+    """
+    บันทึกว่าฝั่ง reader อ่านถึงข้อความ message_id แล้ว (UPDATE เดียว เลื่อนไปข้างหน้าเท่านั้น)
+    unread ถูกนับใหม่จากข้อความของอีกฝั่งที่ใหม่กว่า message_id → ถูกต้องแม้มีข้อความเข้ามาระหว่างนั้น
+    คืน True ถ้ามีการเปลี่ยนแปลง
+    """
+    last_read_field, unread_field = read_fields(reader_is_owner)
+    reader_field = "owner_id" if reader_is_owner else "customer_id"
+    unread = (
+        ChatMessage.objects.filter(thread_id=OuterRef("pk"), pk__gt=message_id)
+        .exclude(sender_id=OuterRef(reader_field))
+        .order_by().values("thread_id").annotate(n=Count("pk")).values("n")
+    )
+    return bool(
+        ChatThread.objects.filter(pk=thread_id, **{f"{last_read_field}__lt": message_id}).update(**{
+            last_read_field: message_id,
+            unread_field: Coalesce(Subquery(unread), Value(0)),
+        })
+    )
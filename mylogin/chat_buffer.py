@@ -0,0 +1,195 @@
+# mylogin/chat_buffer.py
+"""
+จำกัดอัตราและรวมการเขียนข้อความแชท (ใช้ใน ChatConsumer)
+
+- TokenBucket: หนึ่งอันต่อ socket — ส่งได้เฉลี่ย CHAT_RATE_LIMIT ข้อความ/วินาที กระชากได้ถึง CHAT_RATE_BURST ข้อความ
+- ChatWriteBuffer: หนึ่งอันต่อ process — ข้อความของห้องเดียวกันที่เข้ามาภายใน CHAT_WRITE_BATCH_WINDOW วินาที
+  ถูกเขียนด้วย bulk_create + UPDATE ของ thread ครั้งเดียวใน transaction เดียว
+  แต่ละห้องมีงานเขียนที่กำลังทำอยู่ได้ครั้งละหนึ่งงาน → client ที่ส่งรัว ๆ ไม่กิน thread pool ของ database_sync_to_async จนหมด
+  ถ้าคิวของห้องยาวเกิน CHAT_WRITE_MAX_QUEUE ข้อความใหม่จะถูกปฏิเสธ (ChatOverloaded)
+
+ตัวนับทั้งหมดเป็นของ process นั้น ดูได้ที่ adminpanel/runtime-stats
+"""
+import asyncio
+from collections import Counter
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+
+from mylogin.chat import record_messages
+from mylogin.models import ChatMessage, ChatThread
+
+
+class ChatOverloaded(Exception):
+    """คิวเขียนข้อความของห้องนี้เต็ม"""
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._updated = None
+
+    def consume(self, now=None):
+        """ใช้ token หนึ่งอัน คืน False ถ้าไม่เหลือ (ส่งเร็วเกินกำหนด)"""
+        now = asyncio.get_running_loop().time() if now is None else now
+        if self._updated is not None:
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+def connection_bucket():
+    return TokenBucket(getattr(settings, "CHAT_RATE_LIMIT", 5), getattr(settings, "CHAT_RATE_BURST", 10))
+
+
+def max_frame_size():
+    """ขนาด frame สูงสุด (ตัวอักษร) ที่ยอมรับ — ตรวจก่อน json.loads"""
+    return getattr(settings, "CHAT_MAX_FRAME_SIZE", 8192)
+
+
+def max_message_length():
+    return getattr(settings, "CHAT_MAX_MESSAGE_LENGTH", 2000)
+
+
+def write_messages(thread_id, entries):
+    """
+    บันทึกข้อความหลายข้อความของห้องเดียว entries = [(sender_id, sender_is_owner, content), ...] เรียงตามลำดับที่ส่ง
+    คืน list ของ ChatMessage (มี pk) ตามลำดับเดียวกัน
+    """
+    with transaction.atomic():
+        if not connection.features.can_return_rows_from_bulk_insert:
+            # MySQL: bulk_create ไม่คืน id → ล็อกแถว thread ก่อน แล้วอ่าน id ล่าสุดของห้องกลับมา
+            list(ChatThread.objects.select_for_update().filter(pk=thread_id).values_list("pk", flat=True))
+        messages = ChatMessage.objects.bulk_create([
+            ChatMessage(thread_id=thread_id, sender_id=sender_id, content=content)
+            for sender_id, _, content in entries
+        ])
+        if messages[0].pk is None:
+            ids = ChatMessage.objects.filter(thread_id=thread_id).order_by("-id").values_list("id", flat=True)
+            for message, pk in zip(messages, list(ids[:len(messages)])[::-1]):
+                message.pk = pk
+        record_messages(thread_id, messages, owner_sent=sum(1 for _, is_owner, _ in entries if is_owner))
+    return messages
+
+
+class _Pending:
+    __slots__ = ("entry", "future", "submitted_at")
+
+    def __init__(self, entry, future, submitted_at):
+        self.entry = entry
+        self.future = future
+        self.submitted_at = submitted_at
+
+
+class ChatWriteBuffer:
+    """คิวข้อความที่รอเขียนแยกตามห้อง + ตัวนับ (queue depth, batch, ข้อความที่ถูกปฏิเสธ/ล่าช้า)"""
+
+    def __init__(self):
+        self._queues = {}        # {thread_id: [_Pending, ...]}
+        self._writers = {}       # {thread_id: asyncio.Task}
+
+        self.written = 0
+        self.batches = 0
+        self.max_batch_size = 0
+        self.max_queue_depth = 0
+        self.delayed = 0
+        self.max_delay = 0.0
+        self.dropped = Counter()  # {เหตุผล: จำนวน}
+
+    @property
+    def window(self):
+        return getattr(settings, "CHAT_WRITE_BATCH_WINDOW", 0.005)
+
+    @property
+    def max_batch(self):
+        return getattr(settings, "CHAT_WRITE_MAX_BATCH", 100)
+
+    @property
+    def max_queue(self):
+        return getattr(settings, "CHAT_WRITE_MAX_QUEUE", 500)
+
+    @property
+    def delay_warning(self):
+        """ข้อความที่รอเขียนนานกว่านี้ (วินาที) นับเป็น delayed"""
+        return getattr(settings, "CHAT_WRITE_DELAY_WARNING", 0.25)
+
+    def queue_depth(self):
+        return sum(len(queue) for queue in self._queues.values())
+
+    def drop(self, reason):
+        self.dropped[reason] += 1
+
+    async def submit(self, thread_id, sender_id, sender_is_owner, content):
+        """เพิ่มข้อความเข้าคิวของห้อง แล้วรอจนถูกเขียนลง DB คืน ChatMessage (raise ChatOverloaded ถ้าคิวเต็ม)"""
+        queue = self._queues.setdefault(thread_id, [])
+        if len(queue) >= self.max_queue:
+            raise ChatOverloaded(thread_id)
+
+        loop = asyncio.get_running_loop()
+        pending = _Pending((sender_id, sender_is_owner, content), loop.create_future(), loop.time())
+        queue.append(pending)
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth())
+        if thread_id not in self._writers:
+            self._writers[thread_id] = asyncio.ensure_future(self._write_loop(thread_id))
+        return await pending.future
+
+    async def _write_loop(self, thread_id):
+        queue = self._queues[thread_id]
+        try:
+            while queue:
+                if len(queue) < self.max_batch:
+                    # รอรวมข้อความที่ตามมาติด ๆ กัน
+                    await asyncio.sleep(self.window)
+                batch = queue[:self.max_batch]
+                del queue[:len(batch)]
+                try:
+                    messages = await database_sync_to_async(write_messages)(thread_id, [p.entry for p in batch])
+                except Exception as exc:
+                    for pending in batch:
+                        if not pending.future.done():
+                            pending.future.set_exception(exc)
+                    continue
+                self._record_batch(batch)
+                for pending, message in zip(batch, messages):
+                    if not pending.future.done():
+                        pending.future.set_result(message)
+        finally:
+            # ไม่มี await ระหว่างเช็กคิวว่างกับตรงนี้ → ไม่มีข้อความตกค้างโดยไม่มีงานเขียน
+            del self._writers[thread_id]
+            if not queue:
+                del self._queues[thread_id]
+
+    def _record_batch(self, batch):
+        now = asyncio.get_running_loop().time()
+        self.written += len(batch)
+        self.batches += 1
+        self.max_batch_size = max(self.max_batch_size, len(batch))
+        for pending in batch:
+            delay = now - pending.submitted_at
+            self.max_delay = max(self.max_delay, delay)
+            if delay > self.delay_warning:
+                self.delayed += 1
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue_depth(),
+            "max_queue_depth": self.max_queue_depth,
+            "active_threads": len(self._writers),
+            "written": self.written,
+            "batches": self.batches,
+            "avg_batch_size": round(self.written / self.batches, 2) if self.batches else None,
+            "max_batch_size": self.max_batch_size,
+            "delayed": self.delayed,
+            "max_delay_ms": round(self.max_delay * 1000, 1),
+            "dropped": dict(self.dropped),
+        }
+
+
+# instance เดียวต่อ process
+chat_buffer = ChatWriteBuffer()
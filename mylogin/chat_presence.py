@@ -0,0 +1,149 @@
+# mylogin/chat_presence.py
+"""
+สถานะออนไลน์ (presence) และ "กำลังพิมพ์" ของห้องแชท
+
+PresenceRegistry เก็บในหน่วยความจำของแต่ละ process (ASGI worker) ว่า user ไหนมี socket เปิดอยู่ในห้องไหนกี่อัน
+- socket แรกของ user เปิด / socket สุดท้ายปิด → ถือว่าสถานะเปลี่ยน (เปิดหลายแท็บไม่ทำให้ส่ง event เพิ่ม)
+- การเปลี่ยนแปลงถูกรวมไว้แล้วส่งเป็น group_send เดียวต่อห้องทุก PRESENCE_FLUSH_INTERVAL วินาที
+  (reload หน้า = ปิดแล้วเปิดในรอบเดียวกัน → ส่งแค่สถานะสุดท้ายครั้งเดียว)
+- process อื่นรู้สถานะผ่าน channel layer: เมื่อได้ event "เข้าห้อง" หรือ "ออฟไลน์" จาก process อื่น
+  process ที่มี user ของห้องนั้นออนไลน์อยู่จะประกาศซ้ำหนึ่งครั้ง (join=False จึงไม่มีการตอบกลับต่อ)
+
+typing ถูกจำกัดที่ฝั่ง server: แต่ละ socket ส่ง group_send "กำลังพิมพ์" ได้ไม่เกินหนึ่งครั้งต่อ TYPING_THROTTLE วินาที
+หน้าเว็บซ่อนตัวบอกเองเมื่อไม่ได้รับ event ใหม่ภายใน TYPING_TIMEOUT วินาที หรือเมื่อได้รับข้อความ
+"""
+import asyncio
+import uuid
+from collections import Counter
+
+from channels.layers import get_channel_layer
+from django.utils import timezone
+
+# วินาทีที่รวมการเปลี่ยนสถานะออนไลน์ก่อนส่งเข้า group
+PRESENCE_FLUSH_INTERVAL = 1.0
+
+# ระยะห่างขั้นต่ำ (วินาที) ระหว่าง event กำลังพิมพ์ของ socket เดียว
+TYPING_THROTTLE = 2.0
+
+# หน้าเว็บซ่อน "กำลังพิมพ์..." เมื่อไม่มี event ใหม่นานเกินนี้ (ต้องมากกว่า TYPING_THROTTLE)
+TYPING_TIMEOUT = 5.0
+
+
+def room_group_name(thread_id):
+    return f"chat_thread_{thread_id}"
+
+
+class PresenceRegistry:
+    """socket ที่เปิดอยู่ใน process นี้ แยกตาม (thread_id, user_id) พร้อมคิวการเปลี่ยนสถานะที่รอส่ง"""
+
+    def __init__(self, flush_interval=PRESENCE_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self.origin = uuid.uuid4().hex    # ใช้แยก event ที่ process นี้ส่งเอง
+        self._sockets = Counter()         # {(thread_id, user_id): จำนวน socket}
+        self._last_seen = {}              # {(thread_id, user_id): datetime ที่ socket สุดท้ายปิด}
+        self._pending = {}                # {thread_id: {user_id: join}}
+        self._flushes = {}                # {thread_id: asyncio.Task}
+
+        self.group_sends = 0
+
+    def is_online(self, thread_id, user_id):
+        return self._sockets[(thread_id, user_id)] > 0
+
+    def online_users(self, thread_id):
+        return [user_id for (t, user_id), count in self._sockets.items() if t == thread_id and count > 0]
+
+    def connect(self, thread_id, user_id):
+        key = (thread_id, user_id)
+        self._sockets[key] += 1
+        if self._sockets[key] == 1:
+            self._schedule(thread_id, user_id, join=True)
+
+    def disconnect(self, thread_id, user_id):
+        key = (thread_id, user_id)
+        if self._sockets[key] <= 0:
+            return
+        self._sockets[key] -= 1
+        if self._sockets[key] == 0:
+            del self._sockets[key]
+            self._last_seen[key] = timezone.now()
+            self._schedule(thread_id, user_id, join=False)
+
+    def remote_event(self, thread_id, origin, users):
+        """
+        event presence ที่มาจาก process อื่น: ถ้ามีคนเข้าห้องหรือออฟไลน์
+        ประกาศ user ที่ยังออนไลน์อยู่ใน process นี้ซ้ำ (ให้ socket ใหม่รู้สถานะ / แก้กรณีเปิดหลาย process)
+        """
+        if origin == self.origin:
+            return
+        if any(user["join"] or not user["online"] for user in users):
+            for user_id in self.online_users(thread_id):
+                self._schedule(thread_id, user_id, join=False)
+
+    def _schedule(self, thread_id, user_id, join):
+        pending = self._pending.setdefault(thread_id, {})
+        pending[user_id] = pending.get(user_id, False) or join
+        flush = self._flushes.get(thread_id)
+        if flush is None or flush.done():
+            self._flushes[thread_id] = asyncio.ensure_future(self._flush_later(thread_id))
+
+    async def _flush_later(self, thread_id):
+        await asyncio.sleep(self.flush_interval)
+        pending = self._pending.pop(thread_id, {})
+        self._flushes.pop(thread_id, None)
+        if any(pending.values()):
+            # มีคนเข้าห้อง → แนบสถานะของ user อื่นใน process นี้ไปใน event เดียวกัน
+            for user_id in self.online_users(thread_id):
+                pending.setdefault(user_id, False)
+        users = [self._state(thread_id, user_id, join) for user_id, join in pending.items()]
+        if not users:
+            return
+        self.group_sends += 1
+        await get_channel_layer().group_send(room_group_name(thread_id), {
+            "type": "chat_presence",
+            "origin": self.origin,
+            "users": users,
+        })
+
+    def stats(self):
+        return {
+            "sockets": sum(self._sockets.values()),
+            "pending_threads": len(self._pending),
+            "group_sends": self.group_sends,
+        }
+
+    def _state(self, thread_id, user_id, join):
+        online = self.is_online(thread_id, user_id)
+        # ส่ง last_seen ครั้งเดียวแล้วทิ้ง (ไม่ให้ dict โตไปเรื่อย ๆ ใน process ที่รันนาน)
+        last_seen = self._last_seen.pop((thread_id, user_id), None)
+        if online:
+            last_seen = None
+        return {
+            "user_id": user_id,
+            "online": online,
+            "join": join and online,
+            "last_seen": last_seen.isoformat() if last_seen else None,
+        }
+
+
+class TypingThrottle:
+    """จำกัด event กำลังพิมพ์ของ socket เดียว (ใช้ใน ChatConsumer หนึ่ง instance ต่อ socket)"""
+
+    def __init__(self, interval=TYPING_THROTTLE):
+        self.interval = interval
+        self._last_sent = None
+        self.dropped = 0
+
+    def allow(self, now=None):
+        now = asyncio.get_running_loop().time() if now is None else now
+        if self._last_sent is not None and now - self._last_sent < self.interval:
+            self.dropped += 1
+            return False
+        self._last_sent = now
+        return True
+
+    def reset(self):
+        """ส่งข้อความแล้ว → หน้าเว็บซ่อนตัวบอกเอง การพิมพ์ครั้งต่อไปส่งได้ทันที"""
+        self._last_sent = None
+
+
+presence = PresenceRegistry()
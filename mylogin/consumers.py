@@ -1,19 +1,27 @@
 # mylogin/consumers.py
+import asyncio
 import json
+import logging
 
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.db import DatabaseError, IntegrityError
 from django.db.models import Q
-from django.utils import timezone
 
-from mylogin.models import ChatThread, ChatMessage
+from mylogin.chat import READ_RECEIPT_DELAY, mark_read, message_payload
+from mylogin.chat_buffer import ChatOverloaded, chat_buffer, connection_bucket, max_frame_size, max_message_length
+from mylogin.chat_presence import TypingThrottle, presence, room_group_name
+from mylogin.models import ChatThread
+
+logger = logging.getLogger(__name__)
 
 
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         # ดึง thread_id จาก URL: ws/chat/<thread_id>/
         self.thread_id = int(self.scope['url_route']['kwargs']['thread_id'])
-        self.room_group_name = f"chat_thread_{self.thread_id}"
+        self.room_group_name = room_group_name(self.thread_id)
+        self.joined = False
 
         user = self.scope["user"]
         if not user.is_authenticated:
@@ -21,77 +29,155 @@ class ChatConsumer(AsyncWebsocketConsumer):
             return
 
         # เช็กว่า user อยู่ใน thread นี้จริงไหม (ต้องเป็น owner หรือ customer)
-        allowed = await self.user_in_thread(user.id, self.thread_id)
-        if not allowed:
+        # โหลดข้อมูล thread ครั้งเดียวตอน connect แล้วใช้ตลอดอายุ socket
+        thread = await self.load_thread(user.id, self.thread_id)
+        if thread is None:
             await self.close()
             return
+        self.participant_ids = {thread["owner_id"], thread["customer_id"]}
+        self.is_owner = user.id == thread["owner_id"]
+        self.display_name = user.get_full_name() or user.email or "Unknown"
+        self.read_up_to = 0
+        self.read_flush = None
+        self.typing = TypingThrottle()
+        self.bucket = connection_bucket()
 
         await self.channel_layer.group_add(
             self.room_group_name,
             self.channel_name
         )
         await self.accept()
+        self.joined = True
+        presence.connect(self.thread_id, user.id)
 
     async def disconnect(self, close_code):
+        if not self.joined:
+            return
+        presence.disconnect(self.thread_id, self.scope["user"].id)
+        # ส่ง read receipt ที่ค้างอยู่ก่อนปิด
+        if self.read_flush is not None and not self.read_flush.done():
+            self.read_flush.cancel()
+            await self.flush_read()
         await self.channel_layer.group_discard(
             self.room_group_name,
             self.channel_name
         )
 
-    async def receive(self, text_data):
-        data = json.loads(text_data)
-        message = data.get("message", "").strip()
-        if not message:
+    async def receive(self, text_data=None, bytes_data=None):
+        # frame ใหญ่เกินไม่ต้อง parse
+        if text_data is None or len(text_data) > max_frame_size():
+            await self.reject("too_large")
+            return
+        try:
+            data = json.loads(text_data)
+        except ValueError:
+            return
+        if not isinstance(data, dict):
+            return
+        if data.get("typing"):
+            await self.send_typing()
             return
 
-        user = self.scope["user"]
-        display_name = user.get_full_name() or user.email or "Unknown"
-
-        # บันทึกข้อความลง DB + อัปเดต updated_at ของ thread
-        msg = await self.save_message(user, message)
+        message = str(data.get("message", "")).strip()
+        if not message:
+            return
+        if len(message) > max_message_length():
+            await self.reject("too_large")
+            return
+        if not self.bucket.consume():
+            await self.reject("rate_limited")
+            return
 
-        # ใช้เวลาจริงจาก DB (localtime) แล้ว format เป็น HH:MM
-        ts = timezone.localtime(msg.timestamp)
-        timestamp_str = ts.strftime("%H:%M")
+        # บันทึกข้อความลง DB + อัปเดต updated_at ของ thread (รวมกับข้อความอื่นของห้องเดียวกันเป็น batch)
+        try:
+            msg = await chat_buffer.submit(self.thread_id, self.scope["user"].id, self.is_owner, message)
+        except ChatOverloaded:
+            await self.reject("overloaded")
+            return
+        except IntegrityError:
+            # thread ถูกลบไประหว่างที่ socket ยังเปิดอยู่
+            await self.close()
+            return
+        except DatabaseError:
+            # DB ล่ม/lock timeout ระหว่างเขียน batch → ไม่ปิด socket ให้ client แสดงข้อความให้ส่งใหม่
+            logger.exception("บันทึกข้อความแชทของห้อง %s ไม่สำเร็จ", self.thread_id)
+            await self.reject("db_error")
+            return
 
-        # ส่งให้ทั้งสองฝั่งในห้อง
+        # ส่งให้ทั้งสองฝั่งในห้อง (เวลาแสดงผลเป็น localtime HH:MM จากเวลาจริงใน DB)
+        self.typing.reset()
         await self.channel_layer.group_send(
             self.room_group_name,
             {
                 "type": "chat_message",
-                "message": message,
-                "username": display_name,
-                "timestamp": timestamp_str,
+                "username": self.display_name,
+                **message_payload(msg.pk, msg.sender_id, message, msg.timestamp),
             }
         )
 
     async def chat_message(self, event):
         # ส่งกลับไปให้ frontend
         await self.send(text_data=json.dumps({
-            "message": event["message"],
-            "username": event["username"],
-            "timestamp": event["timestamp"],
+            "event": "message", **{key: value for key, value in event.items() if key != "type"},
         }))
+        # ข้อความจากอีกฝั่งที่ส่งถึง socket ที่เปิดอยู่ = อ่านแล้ว (รวมหลายข้อความแล้วบันทึกครั้งเดียว)
+        if event["sender_id"] != self.scope["user"].id:
+            self.read_up_to = max(self.read_up_to, event["id"])
+            if self.read_flush is None or self.read_flush.done():
+                self.read_flush = asyncio.ensure_future(self.flush_read_later())
+
+    async def chat_read(self, event):
+        await self.send(text_data=json.dumps({
+            "event": "read", "reader_id": event["reader_id"], "last_read_id": event["last_read_id"],
+        }))
+
+    async def reject(self, code):
+        """ข้อความไม่ถูกส่ง → นับใน chat_buffer.dropped แล้วแจ้ง socket นี้"""
+        chat_buffer.drop(code)
+        await self.send(text_data=json.dumps({"event": "error", "code": code}))
+
+    async def send_typing(self):
+        # จำกัดที่ฝั่ง server: พิมพ์เร็วแค่ไหนก็ส่งเข้า group ไม่เกินหนึ่งครั้งต่อ TYPING_THROTTLE วินาที
+        if not self.typing.allow():
+            return
+        await self.channel_layer.group_send(self.room_group_name, {
+            "type": "chat_typing",
+            "user_id": self.scope["user"].id,
+        })
+
+    async def chat_typing(self, event):
+        # ไม่ส่งกลับไปหา socket ของคนที่พิมพ์เอง
+        if event["user_id"] != self.scope["user"].id:
+            await self.send(text_data=json.dumps({"event": "typing", "user_id": event["user_id"]}))
+
+    async def chat_presence(self, event):
+        presence.remote_event(self.thread_id, event["origin"], event["users"])
+        users = [user for user in event["users"] if user["user_id"] != self.scope["user"].id]
+        if users:
+            await self.send(text_data=json.dumps({"event": "presence", "users": users}))
+
+    async def flush_read_later(self):
+        await asyncio.sleep(READ_RECEIPT_DELAY)
+        await self.flush_read()
+
+    async def flush_read(self):
+        message_id = self.read_up_to
+        if message_id and await self.save_read(message_id):
+            await self.channel_layer.group_send(self.room_group_name, {
+                "type": "chat_read",
+                "reader_id": self.scope["user"].id,
+                "last_read_id": message_id,
+            })
 
     @database_sync_to_async
-    def user_in_thread(self, user_id, thread_id):
-        """เช็กว่า user คนนั้นอยู่ใน thread นี้หรือเปล่า"""
+    def load_thread(self, user_id, thread_id):
+        """ข้อมูล thread (id ของ owner/customer) ถ้า user คนนั้นอยู่ใน thread นี้ ไม่งั้นคืน None"""
         return ChatThread.objects.filter(
             id=thread_id
         ).filter(
             Q(customer_id=user_id) | Q(owner_id=user_id)
-        ).exists()
+        ).values("owner_id", "customer_id", "venue_id").first()
 
     @database_sync_to_async
-    def save_message(self, user, content):
-        """สร้าง ChatMessage ใหม่ใน thread นี้ แล้วอัปเดตเวลา updated_at ของ thread"""
-        thread = ChatThread.objects.get(pk=self.thread_id)
-        msg = ChatMessage.objects.create(
-            thread=thread,
-            sender=user,
-            content=content
-        )
-        # อัปเดตเวลาแก้ไขล่าสุดของห้องแชท
-        thread.updated_at = timezone.now()
-        thread.save(update_fields=["updated_at"])
-        return msg
+    def save_read(self, message_id):
+        return mark_read(self.thread_id, self.is_owner, message_id)
@@ -10,6 +10,7 @@ from decimal import Decimal
 from django.forms import HiddenInput, ModelChoiceField
 from .models import Activity, ActivityParticipants
 from django.db.models import Q
+from .availability import is_available
 
 # ---------- Auth Forms ----------
 class RegisterForm(UserCreationForm):
@@ -202,10 +203,7 @@ class VenueAmenityForm(forms.ModelForm):
         model = VenueAmenity
         exclude = ["venue"]
         widgets = {
-            f: forms.CheckboxInput() for f in [
-                "wifi", "parking", "equipment", "sound_system", "projector",
-                "air_conditioning", "seating", "drinking_water", "first_aid", "cctv"
-            ]
+            f: forms.CheckboxInput() for f in VenueAmenity.AMENITY_FIELDS
         }
         labels = {
             "wifi": "Wi-Fi อินเทอร์เน็ต",
@@ -314,13 +312,8 @@ class BookingForm(forms.ModelForm):
         if end_date == today and end_time <= now_time:
             raise ValidationError("ไม่สามารถจองช่วงที่สิ้นสุดในอดีตได้ (เวลาในอดีต)")
 
-        overlapping = Booking.objects.filter(
-            venue=venue,
-            start_date__lte=end_date,
-            end_date__gte=start_date
-        ).exclude(start_time__gte=end_time).exclude(end_time__lte=start_time)
-
-        if overlapping.exists():
+        # นับเฉพาะการจองที่ยังมีผล (ไม่รวมที่ถูกปฏิเสธ/ยกเลิก)
+        if not is_available(venue, start_date, end_date, start_time, end_time, exclude_pk=self.instance.pk):
             raise ValidationError(
                 "ช่วงเวลานี้มีผู้ใช้อื่นจองสถานที่แล้ว กรุณาเลือกวันหรือเวลาใหม่"
             )
@@ -0,0 +1,61 @@
+# mylogin/geo.py
+from math import radians, degrees, sin, cos, sqrt, atan2
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_km(lat1, lng1, lat2, lng2) -> float:
+    """
+    คำนวณระยะทางระหว่าง 2 จุด (lat/lng) หน่วย km
+    """
+    lat1, lng1, lat2, lng2 = map(radians, [lat1, lng1, lat2, lng2])
+
+    dlat = lat2 - lat1
+    dlng = lng2 - lng1
+
+    a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlng / 2) ** 2
+    c = 2 * atan2(sqrt(a), sqrt(1 - a))
+    return EARTH_RADIUS_KM * c
+
+
+def bounding_box(lat, lng, radius_km):
+    """
+    สร้างกรอบสี่เหลี่ยม (min_lat, max_lat, min_lng, max_lng) ที่ครอบวงกลมรัศมี radius_km
+    ใช้กรองเบื้องต้นใน DB ผ่าน index ของ latitude/longitude ก่อนคำนวณระยะจริง
+    """
+    dlat = degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat = max(lat - dlat, -90.0)
+    max_lat = min(lat + dlat, 90.0)
+
+    # ใกล้ขั้วโลกหรือกรอบข้ามเส้น 180 องศา → ไม่จำกัด longitude (กรณีนี้แทบไม่เกิดในไทย)
+    max_abs_lat = max(abs(min_lat), abs(max_lat))
+    if max_abs_lat >= 89.0:
+        return min_lat, max_lat, -180.0, 180.0
+
+    dlng = degrees(radius_km / (EARTH_RADIUS_KM * cos(radians(max_abs_lat))))
+    min_lng = lng - dlng
+    max_lng = lng + dlng
+    if min_lng < -180.0 or max_lng > 180.0:
+        return min_lat, max_lat, -180.0, 180.0
+
+    return min_lat, max_lat, min_lng, max_lng
+
+
+def haversine_km_many(lat, lng, lats, lngs):
+    """
+    คำนวณระยะทางจากจุด (lat, lng) ไปยังหลายจุดพร้อมกันด้วย NumPy (คืนค่าเป็น ndarray หน่วย km)
+    lats/lngs เป็น array (หรือ list) ของพิกัดปลายทาง
+    """
+    lat1 = np.radians(lat)
+    lng1 = np.radians(lng)
+    lat2 = np.radians(np.asarray(lats, dtype=float))
+    lng2 = np.radians(np.asarray(lngs, dtype=float))
+
+    dlat = lat2 - lat1
+    dlng = lng2 - lng1
+
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return EARTH_RADIUS_KM * c
@@ -0,0 +1,172 @@
+# mylogin/geo_index.py
+import logging
+import threading
+import time
+from math import floor
+
+import numpy as np
+from django.conf import settings
+
+from mylogin.geo import bounding_box, haversine_km_many
+
+logger = logging.getLogger(__name__)
+
+
+class VenueGeoIndex:
+    """
+    grid ของพิกัดสถานที่ (venue_id, lat, lng) เก็บในหน่วยความจำของแต่ละ worker process
+    - สร้างแบบ lazy ตอนถูกเรียกใช้ครั้งแรก
+    - signal post_save/post_delete ของ Venue จะ patch ทีละแถว (เฉพาะใน process ที่บันทึก)
+    - process อื่นจะ rebuild เองเมื่อครบ GEO_INDEX_TTL วินาที
+    """
+
+    # ขนาดช่อง grid (องศา) ~0.05° ≈ 5.5 km
+    CELL_DEG = 0.05
+
+    def __init__(self, cell_deg=CELL_DEG):
+        self.cell_deg = cell_deg
+        self._lock = threading.RLock()
+        self._cells = None      # {(row, col): {venue_id: (lat, lng)}}
+        self._points = {}       # {venue_id: (row, col)}
+        self._built_at = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.builds = 0
+        self.patches = 0
+
+    @property
+    def ttl(self):
+        return getattr(settings, "GEO_INDEX_TTL", 300)
+
+    def _cell(self, lat, lng):
+        return int(floor(lat / self.cell_deg)), int(floor(lng / self.cell_deg))
+
+    def _is_fresh(self):
+        return self._cells is not None and (time.monotonic() - self._built_at) < self.ttl
+
+    def _build(self):
+        from mylogin.models import Venue
+
+        rows = Venue.objects.filter(
+            latitude__isnull=False, longitude__isnull=False
+        ).values_list("venue_id", "latitude", "longitude")
+
+        cells, points = {}, {}
+        for vid, lat, lng in rows.iterator(chunk_size=5000):
+            lat, lng = float(lat), float(lng)
+            key = self._cell(lat, lng)
+            cells.setdefault(key, {})[vid] = (lat, lng)
+            points[vid] = key
+
+        self._cells = cells
+        self._points = points
+        self._built_at = time.monotonic()
+        self.builds += 1
+        logger.info("VenueGeoIndex built: %d venues in %d cells", len(points), len(cells))
+
+    def _ensure_built(self):
+        with self._lock:
+            if self._is_fresh():
+                self.hits += 1
+                return
+            self.misses += 1
+            self._build()
+
+    def nearby(self, lat, lng, radius_km):
+        """
+        คืน (venue_ids, distances) เป็น ndarray ของสถานที่ที่อยู่ในรัศมี radius_km (ยังไม่เรียง)
+        lat/lng/radius_km ต้องเป็นตัวเลขจำกัด (view ตรวจด้วย _parse_float และจำกัดรัศมีด้วย clamp_radius_km)
+        """
+        self._ensure_built()
+
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+        row_lo, col_lo = self._cell(min_lat, min_lng)
+        row_hi, col_hi = self._cell(max_lat, max_lng)
+
+        ids, lats, lngs = [], [], []
+        with self._lock:
+            cells = self._cells
+            box_cells = max(0, row_hi - row_lo + 1) * max(0, col_hi - col_lo + 1)
+            if box_cells > len(cells):
+                # กรอบใหญ่กว่าจำนวนช่องที่มีสถานที่ → ไล่เฉพาะช่องที่มีข้อมูลแทน (ไม่วนทุกช่องในกรอบ)
+                keys = [
+                    key for key in cells
+                    if row_lo <= key[0] <= row_hi and col_lo <= key[1] <= col_hi
+                ]
+            else:
+                keys = [(row, col) for row in range(row_lo, row_hi + 1) for col in range(col_lo, col_hi + 1)]
+            for key in keys:
+                bucket = cells.get(key)
+                if not bucket:
+                    continue
+                for vid, (vlat, vlng) in bucket.items():
+                    ids.append(vid)
+                    lats.append(vlat)
+                    lngs.append(vlng)
+
+        if not ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=float)
+
+        venue_ids = np.array(ids, dtype=np.int64)
+        distances = haversine_km_many(lat, lng, lats, lngs)
+        in_radius = distances <= radius_km
+        return venue_ids[in_radius], distances[in_radius]
+
+    def upsert(self, venue_id, lat, lng):
+        """อัปเดตพิกัดของสถานที่เดียว (ถ้า index ยังไม่ถูกสร้าง ไม่ต้องทำอะไร)"""
+        with self._lock:
+            if self._cells is None:
+                return
+            self._discard(venue_id)
+            if lat is not None and lng is not None:
+                lat, lng = float(lat), float(lng)
+                key = self._cell(lat, lng)
+                self._cells.setdefault(key, {})[venue_id] = (lat, lng)
+                self._points[venue_id] = key
+            self.patches += 1
+
+    def remove(self, venue_id):
+        with self._lock:
+            if self._cells is None:
+                return
+            self._discard(venue_id)
+            self.patches += 1
+
+    def _discard(self, venue_id):
+        key = self._points.pop(venue_id, None)
+        if key is None:
+            return
+        bucket = self._cells.get(key)
+        if bucket is not None:
+            bucket.pop(venue_id, None)
+            if not bucket:
+                del self._cells[key]
+
+    def invalidate(self):
+        with self._lock:
+            self._cells = None
+            self._points = {}
+
+    def stats(self):
+        with self._lock:
+            return {
+                "venues": len(self._points),
+                "cells": len(self._cells) if self._cells is not None else 0,
+                "hits": self.hits,
+                "misses": self.misses,
+                "builds": self.builds,
+                "patches": self.patches,
+                "age_seconds": round(time.monotonic() - self._built_at, 1) if self._cells is not None else None,
+            }
+
+
+def clamp_radius_km(radius_km, default):
+    """รัศมีจาก query string → ค่าเริ่มต้นถ้าไม่ได้ส่ง/ไม่เป็นบวก และไม่เกิน NEARBY_MAX_RADIUS_KM (ค่าเริ่มต้น 100 km)"""
+    if radius_km is None or radius_km <= 0:
+        return default
+    return min(radius_km, getattr(settings, "NEARBY_MAX_RADIUS_KM", 100.0))
+
+
+# instance เดียวต่อ process
+venue_geo_index = VenueGeoIndex()
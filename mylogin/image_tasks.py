@@ -0,0 +1,117 @@
+# mylogin/image_tasks.py
+"""
+งานเบื้องหลังสำหรับไฟล์รูปที่ผู้ใช้อัปโหลด (รันโดย manage.py run_worker)
+- รูปสถานที่: หมุนตาม EXIF, ลบ metadata (พิกัด GPS ฯลฯ), ย่อด้านยาวไม่เกิน MAX_VENUE_IMAGE_SIDE, สร้าง thumbnail ล่วงหน้า
+- สลิปโอนเงิน: แปลงเป็น JPEG ขนาดพออ่านได้, สร้าง thumbnail ขนาด slip (ที่หน้ารายการจองลิงก์ไป) ล่วงหน้า
+- QR บัญชี: ลบ metadata, เก็บเป็น PNG (ไม่บีบอัดแบบเสียรายละเอียด QR จะได้สแกนได้)
+
+ไฟล์ใหม่จะถูกบันทึกก่อน แล้วค่อยเปลี่ยนชื่อไฟล์ใน DB และลบไฟล์เก่า
+ถ้าผู้ใช้เปลี่ยนรูประหว่างที่ประมวลผล (ชื่อไฟล์ใน DB ไม่ตรงแล้ว) จะทิ้งผลลัพธ์
+"""
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from mylogin.models import Booking, CustomUser, VenueImage
+from mylogin.tasks import task
+from mylogin.thumbnails import delete_thumbnails, get_thumbnail
+
+MAX_VENUE_IMAGE_SIDE = 2560
+MAX_SLIP_SIDE = 2000
+MAX_QR_SIDE = 1024
+
+VENUE_IMAGE_THUMBNAILS = ("square", "card", "large")
+
+_EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp"}
+
+
+def _reencode(fieldfile, max_side, fmt=None):
+    """อ่านไฟล์เดิม → หมุนตาม EXIF, ย่อ, เข้ารหัสใหม่โดยไม่มี metadata แล้วบันทึกเป็นไฟล์ใหม่ (คืนชื่อไฟล์ใหม่)"""
+    storage = fieldfile.storage
+    with storage.open(fieldfile.name, "rb") as fp, Image.open(fp) as img:
+        fmt = fmt or (img.format if img.format in _EXTENSIONS else "JPEG")
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)  # ย่ออย่างเดียว ไม่ขยาย
+        if fmt == "JPEG" and img.mode != "RGB":
+            img = img.convert("RGB")
+
+        # สร้างรูปใหม่จาก pixel อย่างเดียว → ไม่มี EXIF/XMP/ICC ติดไปกับไฟล์
+        clean = Image.new(img.mode, img.size)
+        clean.paste(img)
+        if img.mode == "P":
+            clean.putpalette(img.getpalette())
+
+        out = BytesIO()
+        clean.save(out, fmt, quality=85, optimize=True)
+
+    root, _ = os.path.splitext(fieldfile.name)
+    return storage.save(f"{root}.{_EXTENSIONS[fmt]}", ContentFile(out.getvalue()))
+
+
+def _replace_file(model, pk, field_name, fieldfile, new_name, **extra):
+    """เปลี่ยนชื่อไฟล์ใน DB (เฉพาะถ้ายังเป็นไฟล์เดิม) แล้วลบไฟล์เก่า — คืน True ถ้าเปลี่ยนสำเร็จ"""
+    old_name = fieldfile.name
+    updated = model.objects.filter(pk=pk, **{field_name: old_name}).update(**{field_name: new_name}, **extra)
+    if not updated:
+        fieldfile.storage.delete(new_name)
+        return False
+    delete_thumbnails(fieldfile)
+    fieldfile.storage.delete(old_name)
+    return True
+
+
+# ========================================
+# รูปสถานที่
+# ========================================
+def _mark_venue_image_failed(image_id):
+    VenueImage.objects.filter(pk=image_id).update(processing_status="failed")
+
+
+@task("images.process_venue_image", on_failure=_mark_venue_image_failed)
+def process_venue_image(image_id):
+    image = VenueImage.objects.filter(pk=image_id).first()
+    if image is None or not image.image:
+        return
+    VenueImage.objects.filter(pk=image_id).update(processing_status="processing")
+
+    try:
+        new_name = _reencode(image.image, MAX_VENUE_IMAGE_SIDE)
+    except Exception:
+        # กลับเป็น pending ระหว่างรอลองใหม่ (ครั้งสุดท้าย on_failure จะตั้งเป็น failed)
+        VenueImage.objects.filter(pk=image_id).update(processing_status="pending")
+        raise
+    replaced = _replace_file(
+        VenueImage, image_id, "image", image.image, new_name,
+        processing_status="ready", processed_at=timezone.now(),
+    )
+    if replaced:
+        new_file = FieldFile(image, image.image.field, new_name)
+        for size in VENUE_IMAGE_THUMBNAILS:
+            get_thumbnail(new_file, size)
+
+
+# ========================================
+# สลิปโอนเงิน / QR บัญชีเจ้าของ
+# ========================================
+@task("images.normalize_payment_slip")
+def normalize_payment_slip(booking_id):
+    booking = Booking.objects.filter(pk=booking_id).first()
+    if booking is None or not booking.payment_slip:
+        return
+    new_name = _reencode(booking.payment_slip, MAX_SLIP_SIDE, fmt="JPEG")
+    if _replace_file(Booking, booking_id, "payment_slip", booking.payment_slip, new_name):
+        get_thumbnail(FieldFile(booking, booking.payment_slip.field, new_name), "slip")
+
+
+@task("images.process_bank_qr")
+def process_bank_qr(user_id):
+    user = CustomUser.objects.filter(pk=user_id).first()
+    if user is None or not user.bank_qr:
+        return
+    new_name = _reencode(user.bank_qr, MAX_QR_SIDE, fmt="PNG")
+    if _replace_file(CustomUser, user_id, "bank_qr", user.bank_qr, new_name):
+        get_thumbnail(FieldFile(user, user.bank_qr.field, new_name), "qr")
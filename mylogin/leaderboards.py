@@ -0,0 +1,155 @@
+# mylogin/leaderboards.py
+"""
+สถานที่ยอดฮิต 3 แบบ (จองสำเร็จ, จัดกิจกรรม, รีวิว) ที่คำนวณไว้ล่วงหน้าในตาราง VenueLeaderboardEntry
+- refresh_leaderboards(): คำนวณใหม่ทั้งหมด (ใช้กับ manage.py refresh_leaderboards แบบตั้งเวลา)
+- update_venue_score(): อัปเดตเฉพาะสถานที่เดียวเมื่อมี Booking/Activity/Review เปลี่ยน (ล็อกเฉพาะแถวที่เปลี่ยน)
+- get_leaderboards(): หน้า landing อ่านทั้ง 3 อันดับใน query เดียว
+"""
+import logging
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Cast, NullIf
+
+from mylogin.models import Venue, VenueLeaderboardEntry
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_SIZE = 6
+
+# get_leaderboards() เจอตารางว่าง → คำนวณได้ไม่เกินหนึ่งครั้งต่อช่วงเวลานี้ (วินาที)
+EMPTY_REFRESH_SECONDS = 300
+EMPTY_REFRESH_CACHE_KEY = "leaderboards:empty_refresh"
+
+KINDS = [kind for kind, _ in VenueLeaderboardEntry.KIND_CHOICES]
+
+# ชื่อ attribute ที่ template ใช้ (score, count)
+DISPLAY_ATTRS = {
+    "completed_booking": ("completed_booking_count", None),
+    "activity": ("activity_count", None),
+    "review": ("avg_rating", "review_count"),
+}
+
+
+def _scored_venues(kind):
+    """Venue พร้อม lb_score/lb_count (อ่านจากตัวนับ VenueStats ไม่ต้อง aggregate) เรียงตามอันดับ"""
+    qs = Venue.objects.all()
+    if kind == "completed_booking":
+        qs = qs.annotate(lb_score=F("stats__completed_booking_count"), lb_count=Value(0))
+    elif kind == "activity":
+        qs = qs.annotate(lb_score=F("stats__activity_count"), lb_count=Value(0))
+    elif kind == "review":
+        qs = qs.annotate(
+            lb_score=Cast("stats__rating_sum", FloatField()) / NullIf("stats__rating_count", 0),
+            lb_count=F("stats__rating_count"),
+        )
+    else:
+        raise ValueError(f"unknown leaderboard kind: {kind}")
+    return qs.order_by(F("lb_score").desc(nulls_last=True), F("lb_count").desc(nulls_last=True), "-venue_id")
+
+
+def _rank_key(item):
+    venue_id, (score, count) = item
+    return score, count, venue_id
+
+
+def _write(kind, ranked):
+    VenueLeaderboardEntry.objects.filter(kind=kind).delete()
+    VenueLeaderboardEntry.objects.bulk_create([
+        VenueLeaderboardEntry(kind=kind, rank=rank, venue_id=venue_id, score=score, count=count)
+        for rank, (venue_id, (score, count)) in enumerate(ranked, start=1)
+    ])
+
+
+def refresh_leaderboard(kind):
+    """คำนวณอันดับของ kind นี้ใหม่ทั้งหมด"""
+    top = _scored_venues(kind).values_list("venue_id", "lb_score", "lb_count")[:LEADERBOARD_SIZE]
+    ranked = [(vid, (float(score or 0), count or 0)) for vid, score, count in top]
+    try:
+        with transaction.atomic():
+            _write(kind, ranked)
+    except IntegrityError:
+        # มีอีก process refresh kind เดียวกันพร้อมกัน → ใช้ผลของอีกฝั่ง
+        logger.info("Leaderboard %s refreshed concurrently, skipped", kind)
+
+
+def refresh_leaderboards():
+    for kind in KINDS:
+        refresh_leaderboard(kind)
+
+
+class _RankingChanged(Exception):
+    """อันดับใน DB ถูกแก้ไปแล้วระหว่างที่คำนวณ"""
+
+
+def _apply_ranking(kind, current, ranked):
+    """
+    เขียนเฉพาะอันดับที่เปลี่ยน: UPDATE แถว (kind, rank) นั้นแบบ compare-and-set บน venue_id เดิม
+    → ล็อกเฉพาะแถวที่เปลี่ยน ไม่ล็อกทั้งอันดับ ถ้ามีคนแก้แถวเดียวกันพร้อมกันจะ raise _RankingChanged
+    """
+    with transaction.atomic():
+        for rank, (venue_id, (score, count)) in enumerate(ranked, start=1):
+            old = current[rank - 1] if rank <= len(current) else None
+            if old == (venue_id, (score, count)):
+                continue
+            if old is None:
+                VenueLeaderboardEntry.objects.create(kind=kind, rank=rank, venue_id=venue_id, score=score, count=count)
+            elif not VenueLeaderboardEntry.objects.filter(kind=kind, rank=rank, venue_id=old[0]).update(
+                venue_id=venue_id, score=score, count=count,
+            ):
+                raise _RankingChanged(kind)
+
+
+def update_venue_score(kind, venue_id):
+    """
+    อัปเดตคะแนนของสถานที่เดียวแล้วจัดอันดับใหม่เฉพาะใน 6 อันดับเดิม (เขียนเฉพาะแถวที่เปลี่ยน)
+    ถ้าคะแนนของสถานที่ที่อยู่ในอันดับลดลง (เช่น ลบรีวิว) จะคำนวณใหม่ทั้งหมด
+    เพราะสถานที่นอกอันดับอาจแซงขึ้นมาได้
+    """
+    row = _scored_venues(kind).filter(venue_id=venue_id).values_list("lb_score", "lb_count").first()
+    new = (float(row[0] or 0), row[1] or 0) if row else None
+
+    entries = list(VenueLeaderboardEntry.objects.filter(kind=kind).order_by("rank"))
+    current = [(e.venue_id, (e.score, e.count)) for e in entries]
+    board = dict(current)
+    old = board.get(venue_id)
+
+    if not entries or (old is not None and (new is None or new < old)):
+        refresh_leaderboard(kind)
+        return
+
+    if new is not None:
+        board[venue_id] = new
+    ranked = sorted(board.items(), key=_rank_key, reverse=True)[:LEADERBOARD_SIZE]
+    if ranked == current:
+        return
+    try:
+        _apply_ranking(kind, current, ranked)
+    except (IntegrityError, _RankingChanged):
+        # มีอีก process แก้อันดับเดียวกันพร้อมกัน → คำนวณใหม่ทั้งหมดจากตัวนับล่าสุด
+        logger.info("Leaderboard %s updated concurrently, refreshing", kind)
+        refresh_leaderboard(kind)
+
+
+def get_leaderboards():
+    """
+    คืน {kind: [Venue, ...]} เรียงตามอันดับ พร้อมแนบ attribute สำหรับแสดงผล
+    (completed_booking_count / activity_count / avg_rating + review_count)
+    """
+    entries = list(VenueLeaderboardEntry.objects.select_related("venue").prefetch_related("venue__images").order_by("kind", "rank"))
+    # ยังไม่เคยคำนวณ (deploy ใหม่) → คำนวณครั้งเดียวแล้วจดไว้ใน cache
+    # ถ้าผลยังว่าง (ยังไม่มีสถานที่) จะไม่คำนวณซ้ำทุก request จนกว่า key จะหมดอายุ
+    if not entries and cache.add(EMPTY_REFRESH_CACHE_KEY, True, EMPTY_REFRESH_SECONDS):
+        refresh_leaderboards()
+        entries = list(VenueLeaderboardEntry.objects.select_related("venue").prefetch_related("venue__images").order_by("kind", "rank"))
+
+    boards = {kind: [] for kind in KINDS}
+    for entry in entries:
+        venue = entry.venue
+        score_attr, count_attr = DISPLAY_ATTRS[entry.kind]
+        setattr(venue, score_attr, entry.score if entry.kind == "review" else int(entry.score))
+        if count_attr:
+            setattr(venue, count_attr, entry.count)
+        boards[entry.kind].append(venue)
+    return boards
@@ -0,0 +1,114 @@
+# mylogin/management/commands/bench_channel_layer.py
+import asyncio
+import multiprocessing
+import time
+import uuid
+
+import django
+from django.core.management.base import BaseCommand
+
+# หมายเหตุ: ห้าม import models ที่ระดับ module (process ลูกแบบ spawn import module นี้ก่อน django.setup())
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def _subscriber(index, alias, group, channels, messages, timeout, ready, results):
+    """process ลูก: สร้าง channel เข้า group แล้วรอรับข้อความ คืน latency (วินาที) ของทุกข้อความที่ได้รับ"""
+    django.setup()
+    from channels.layers import get_channel_layer
+
+    async def run():
+        layer = get_channel_layer(alias)
+        names = [await layer.new_channel() for _ in range(channels)]
+        for name in names:
+            await layer.group_add(group, name)
+        ready.put(index)
+
+        latencies = []
+
+        async def consume(name):
+            for _ in range(messages):
+                message = await layer.receive(name)
+                latencies.append(time.time() - message["sent"])
+
+        try:
+            await asyncio.wait_for(asyncio.gather(*(consume(name) for name in names)), timeout)
+        except asyncio.TimeoutError:
+            pass
+        for name in names:
+            await layer.group_discard(group, name)
+        return latencies
+
+    results.put((index, asyncio.run(run())))
+
+
+class Command(BaseCommand):
+    help = "วัด latency ของการกระจายข้อความ (group_send) ผ่าน channel layer ไปยัง consumer ในหลาย process"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=4, help="จำนวน process ผู้รับ (จำลอง Daphne worker)")
+        parser.add_argument("--channels", type=int, default=25, help="จำนวน channel (socket) ต่อ process")
+        parser.add_argument("--messages", type=int, default=200, help="จำนวนข้อความที่ส่งเข้า group")
+        parser.add_argument("--rate", type=float, default=100, help="ข้อความต่อวินาทีที่ส่ง (0 = เร็วที่สุด)")
+        parser.add_argument("--timeout", type=float, default=30, help="วินาทีที่ผู้รับรอก่อนเลิก")
+        parser.add_argument("--layer", default="default", help="alias ใน CHANNEL_LAYERS")
+
+    def handle(self, *args, **options):
+        from channels.layers import get_channel_layer
+
+        layer = get_channel_layer(options["layer"])
+        self.stdout.write(f"channel layer: {type(layer).__module__}.{type(layer).__name__}")
+
+        group = f"bench_{uuid.uuid4().hex[:12]}"
+        context = multiprocessing.get_context("spawn")
+        ready, results = context.Queue(), context.Queue()
+        workers = [
+            context.Process(target=_subscriber, args=(
+                i, options["layer"], group, options["channels"], options["messages"], options["timeout"], ready, results,
+            ))
+            for i in range(options["processes"])
+        ]
+        for worker in workers:
+            worker.start()
+        for _ in workers:
+            ready.get(timeout=60)
+
+        async def publish():
+            delay = 1 / options["rate"] if options["rate"] > 0 else 0
+            started = time.monotonic()
+            for seq in range(options["messages"]):
+                await layer.group_send(group, {"type": "bench.message", "seq": seq, "sent": time.time()})
+                if delay:
+                    await asyncio.sleep(delay)
+            return time.monotonic() - started
+
+        send_seconds = asyncio.run(publish())
+        collected = dict(results.get(timeout=options["timeout"] + 60) for _ in workers)
+        for worker in workers:
+            worker.join()
+
+        expected = options["messages"] * options["channels"]
+        all_latencies = []
+        for index in sorted(collected):
+            latencies = collected[index]
+            all_latencies.extend(latencies)
+            self.stdout.write(
+                f"process {index}: ได้รับ {len(latencies)}/{expected} "
+                f"p50 {_percentile(latencies, 50) * 1000:.1f} ms, p95 {_percentile(latencies, 95) * 1000:.1f} ms"
+            )
+
+        total_expected = expected * len(workers)
+        style = self.style.SUCCESS if len(all_latencies) == total_expected else self.style.WARNING
+        self.stdout.write(style(
+            f"รวม: ส่ง {options['messages']} ข้อความใน {send_seconds:.2f} s, "
+            f"ส่งถึง {len(all_latencies)}/{total_expected} sockets\n"
+            f"latency p50 {_percentile(all_latencies, 50) * 1000:.1f} ms, "
+            f"p95 {_percentile(all_latencies, 95) * 1000:.1f} ms, "
+            f"p99 {_percentile(all_latencies, 99) * 1000:.1f} ms, "
+            f"max {max(all_latencies, default=0) * 1000:.1f} ms"
+        ))
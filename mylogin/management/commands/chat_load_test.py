@@ -0,0 +1,138 @@
+# mylogin/management/commands/chat_load_test.py
+import asyncio
+import math
+import time
+from collections import Counter
+
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand, CommandError
+
+from mylogin.chat_presence import TYPING_THROTTLE, presence
+from mylogin.models import ChatThread
+from mylogin.routing import websocket_urlpatterns
+
+
+class _Socket:
+    """socket จำลองหนึ่งอัน: เก็บจำนวน event ที่ได้รับแยกตามชนิด"""
+
+    def __init__(self, application, thread, user):
+        self.thread = thread
+        self.user = user
+        self.communicator = WebsocketCommunicator(application, f"/ws/chat/{thread.pk}/")
+        self.communicator.scope["user"] = user
+        self.received = Counter()
+        self._drain = None
+
+    async def connect(self):
+        connected, _ = await self.communicator.connect()
+        if not connected:
+            raise CommandError(f"เชื่อมต่อห้อง {self.thread.pk} ไม่ได้ (user {self.user.pk})")
+        # อ่านจาก output_queue ตรง ๆ (receive_output ที่ timeout จะยกเลิก consumer)
+        self._drain = asyncio.ensure_future(self._receive_forever())
+
+    async def _receive_forever(self):
+        while True:
+            message = await self.communicator.output_queue.get()
+            if message["type"] == "websocket.send":
+                self.received[message["text"].split('"event": "', 1)[-1].split('"', 1)[0]] += 1
+
+    async def type_for(self, duration, rate):
+        """ส่ง {"typing": true} ทุกครั้งที่กดแป้น (ไม่จำกัดฝั่ง client) เป็นเวลา duration วินาที"""
+        delay = 1 / rate
+        deadline = time.monotonic() + duration
+        sent = 0
+        while time.monotonic() < deadline:
+            await self.communicator.send_json_to({"typing": True})
+            sent += 1
+            await asyncio.sleep(delay)
+        return sent
+
+    async def close(self):
+        await self.communicator.disconnect()
+        self._drain.cancel()
+
+
+class Command(BaseCommand):
+    help = (
+        "ทดสอบโหลด presence/กำลังพิมพ์ของ ChatConsumer: เปิด socket จำลองในห้องแชทที่มีอยู่ "
+        "ให้ทุก socket พิมพ์รัว ๆ แล้ววัดว่าจำนวน group_send และ event ต่อ socket ไม่เกินเพดานที่คำนวณได้"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=5, help="จำนวนห้องแชท (ใช้ห้องที่มีอยู่ใน DB)")
+        parser.add_argument("--sockets", type=int, default=2, help="จำนวน socket ต่อผู้ใช้ต่อห้อง (จำลองหลายแท็บ)")
+        parser.add_argument("--duration", type=float, default=10, help="วินาทีที่พิมพ์")
+        parser.add_argument("--rate", type=float, default=20, help="จำนวนครั้งที่กดแป้นต่อวินาทีต่อ socket")
+
+    def handle(self, *args, **options):
+        threads = list(ChatThread.objects.select_related("owner", "customer").order_by("-updated_at")[:options["threads"]])
+        if not threads:
+            raise CommandError("ยังไม่มีห้องแชทใน DB")
+        result = asyncio.run(self._run(threads, options))
+        self._report(threads, options, *result)
+
+    async def _run(self, threads, options):
+        application = URLRouter(websocket_urlpatterns)
+        sockets = [
+            _Socket(application, thread, user)
+            for thread in threads
+            for user in (thread.owner, thread.customer)
+            for _ in range(options["sockets"])
+        ]
+        # นับ group_send ทุกครั้งที่ผ่าน channel layer (consumer ใช้ instance เดียวกันนี้)
+        layer_sends = Counter()
+        layer = get_channel_layer()
+        original_group_send = layer.group_send
+
+        async def counting_group_send(group, message):
+            layer_sends[message["type"]] += 1
+            return await original_group_send(group, message)
+
+        layer.group_send = counting_group_send
+        presence_before = presence.group_sends
+        try:
+            for socket in sockets:
+                await socket.connect()
+            started = time.monotonic()
+            keystrokes = await asyncio.gather(*(socket.type_for(options["duration"], options["rate"]) for socket in sockets))
+            elapsed = time.monotonic() - started
+            # รอ presence ที่ค้างอยู่ + event สุดท้ายส่งถึง socket
+            await asyncio.sleep(presence.flush_interval + 0.5)
+        finally:
+            for socket in sockets:
+                await socket.close()
+            await asyncio.sleep(presence.flush_interval + 0.5)
+            layer.group_send = original_group_send
+        return sockets, sum(keystrokes), elapsed, layer_sends, presence.group_sends - presence_before
+
+    def _report(self, threads, options, sockets, keystrokes, elapsed, layer_sends, presence_sends):
+        per_socket_sends = layer_sends["chat_typing"] / len(sockets)
+        # เพดาน: ต่อ socket ส่ง typing ได้ไม่เกิน ceil(เวลา / TYPING_THROTTLE) ครั้ง
+        max_sends = math.ceil(elapsed / TYPING_THROTTLE) + 1
+        # socket หนึ่งได้รับ typing จาก socket ของอีกฝั่งในห้องเท่านั้น
+        max_typing_received = max_sends * options["sockets"]
+        # presence: เข้าห้อง + ประกาศซ้ำ + ออฟไลน์ — ไม่ขึ้นกับจำนวนครั้งที่พิมพ์
+        max_presence_received = 3
+
+        worst_typing = max(s.received["typing"] for s in sockets)
+        worst_presence = max(s.received["presence"] for s in sockets)
+        self.stdout.write(
+            f"ห้อง {len(threads)}, socket {len(sockets)}, พิมพ์ {elapsed:.1f} s ที่ {options['rate']:g} ครั้ง/วินาที "
+            f"(รวม {keystrokes} ครั้ง)\n"
+            f"group_send typing {layer_sends['chat_typing']} ครั้ง "
+            f"(เฉลี่ย {per_socket_sends:.1f}/socket, เพดาน {max_sends}), "
+            f"presence {presence_sends} ครั้ง\n"
+            f"event ที่ได้รับต่อ socket (สูงสุด): typing {worst_typing} (เพดาน {max_typing_received}), "
+            f"presence {worst_presence} (เพดาน {max_presence_received}), "
+            f"= {(worst_typing + worst_presence) / elapsed:.2f} event/s เทียบกับ {options['rate']:g} keystroke/s"
+        )
+        bounded = (
+            per_socket_sends <= max_sends
+            and worst_typing <= max_typing_received
+            and worst_presence <= max_presence_received
+        )
+        if not bounded:
+            raise CommandError("จำนวน event ต่อ socket เกินเพดาน")
+        self.stdout.write(self.style.SUCCESS("ผ่าน: จำนวน event ต่อ socket มีเพดานไม่ขึ้นกับความเร็วในการพิมพ์"))
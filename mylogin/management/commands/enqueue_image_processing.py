@@ -0,0 +1,40 @@
+# mylogin/management/commands/enqueue_image_processing.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from mylogin.models import BackgroundTask, VenueImage
+
+TASK_NAME = "images.process_venue_image"
+
+
+class Command(BaseCommand):
+    help = "ส่งรูปสถานที่ที่ยังไม่ได้ประมวลผล (หรือประมวลผลไม่สำเร็จ) เข้าคิวของ run_worker อีกครั้ง"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--status", nargs="+", default=["pending", "failed"],
+            choices=[value for value, _ in VenueImage.PROCESSING_CHOICES],
+            help="สถานะของรูปที่จะส่งเข้าคิว (ค่าเริ่มต้น pending failed)",
+        )
+
+    def handle(self, *args, **options):
+        # ข้ามรูปที่มีงานรออยู่ในคิวแล้ว
+        queued = {
+            kwargs.get("image_id")
+            for kwargs in BackgroundTask.objects.filter(name=TASK_NAME, status__in=["queued", "running"])
+            .values_list("kwargs", flat=True)
+        }
+        image_ids = [
+            pk for pk in VenueImage.objects.filter(processing_status__in=options["status"])
+            .values_list("pk", flat=True).order_by("pk")
+            if pk not in queued
+        ]
+
+        with transaction.atomic():
+            VenueImage.objects.filter(pk__in=image_ids).update(processing_status="pending")
+            BackgroundTask.objects.bulk_create(
+                [BackgroundTask(name=TASK_NAME, kwargs={"image_id": pk}) for pk in image_ids],
+                batch_size=500,
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"ส่งรูปเข้าคิวแล้ว {len(image_ids)} รูป"))
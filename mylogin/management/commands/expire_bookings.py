@@ -0,0 +1,46 @@
+# mylogin/management/commands/expire_bookings.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from mylogin.booking_expiry import expire_batch, expiry_rules
+
+
+class Command(BaseCommand):
+    help = "ยกเลิกการจอง pending/approved ที่ค้างเกินกำหนด เพื่อคืนช่วงเวลาให้จองใหม่ได้"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=500, help="จำนวนการจองที่ยกเลิกต่อ UPDATE")
+        parser.add_argument("--loop", action="store_true", help="ทำงานวนไปเรื่อย ๆ (รันเป็น process ค้างไว้)")
+        parser.add_argument("--interval", type=float, default=300, help="วินาทีที่รอระหว่างรอบเมื่อใช้ --loop")
+        parser.add_argument("--dry-run", action="store_true", help="นับจำนวนที่หมดอายุอย่างเดียว ไม่ยกเลิก")
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            self._sweep(options)
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
+
+    def _sweep(self, options):
+        total = 0
+        for name, queryset, order_field in expiry_rules():
+            if options["dry_run"]:
+                self.stdout.write(f"{name}: หมดอายุ {queryset.count()} รายการ")
+                continue
+
+            while True:
+                started = time.monotonic()
+                expired = expire_batch(queryset, order_field, options["batch"])
+                if not expired:
+                    break
+                total += len(expired)
+                elapsed_ms = (time.monotonic() - started) * 1000
+                self.stdout.write(f"{name}: ยกเลิก {len(expired)} รายการ ({elapsed_ms:.1f} ms)")
+                if len(expired) < options["batch"]:
+                    break
+
+        if not options["dry_run"]:
+            self.stdout.write(self.style.SUCCESS(f"คืนช่วงเวลาที่ถูกจองค้างไว้ทั้งหมด {total} รายการ"))
@@ -0,0 +1,39 @@
+# mylogin/management/commands/fingerprint_slips.py
+from django.core.management.base import BaseCommand
+
+from mylogin.models import Booking
+from mylogin.slip_fingerprint import HASH_BANDS, apply_slip_fingerprint
+
+FINGERPRINT_FIELDS = [
+    "slip_sha256", "slip_dhash", "slip_duplicate_of", "slip_duplicate_kind",
+    *[f"slip_hash_band{i}" for i in range(HASH_BANDS)],
+]
+
+
+class Command(BaseCommand):
+    help = "สร้างลายนิ้วมือให้สลิปที่อัปโหลดไว้ก่อนมีการตรวจสลิปซ้ำ (เรียงจากเก่าไปใหม่ สลิปที่มาทีหลังจะถูกตั้งธงซ้ำ)"
+
+    def handle(self, *args, **options):
+        bookings = (
+            Booking.objects.filter(slip_sha256="")
+            .exclude(payment_slip="").exclude(payment_slip__isnull=True)
+            .only("pk", "payment_slip").order_by("pk")
+        )
+        done = flagged = missing = 0
+        for booking in bookings.iterator(chunk_size=500):
+            try:
+                with booking.payment_slip.open("rb") as slip:
+                    _, kind = apply_slip_fingerprint(booking, slip)
+            except FileNotFoundError:
+                missing += 1
+                continue
+            # update_fields → ไม่ไปแตะ payment_slip/status (ไม่ enqueue งานรูปซ้ำ)
+            booking.save(update_fields=FINGERPRINT_FIELDS)
+            done += 1
+            if kind:
+                flagged += 1
+                self.stdout.write(self.style.WARNING(
+                    f"booking {booking.pk}: สลิป{booking.get_slip_duplicate_kind_display()}กับ booking {booking.slip_duplicate_of_id}"
+                ))
+
+        self.stdout.write(self.style.SUCCESS(f"สร้างลายนิ้วมือ {done} สลิป, ซ้ำ {flagged}, ไม่พบไฟล์ {missing}"))
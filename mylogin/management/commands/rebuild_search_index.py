@@ -0,0 +1,26 @@
+# mylogin/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from mylogin.models import Venue
+from mylogin.search import index_venue
+
+
+class Command(BaseCommand):
+    help = "สร้างดัชนีค้นหาข้อความ (VenueSearchToken) ของสถานที่ทั้งหมดใหม่"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--venue", type=int, action="append", help="ทำเฉพาะ venue_id ที่ระบุ (ใส่ซ้ำได้)")
+
+    def handle(self, *args, **options):
+        venues = Venue.objects.all()
+        if options["venue"]:
+            venues = venues.filter(venue_id__in=options["venue"])
+
+        count = 0
+        for venue in venues.iterator(chunk_size=500):
+            with transaction.atomic():
+                index_venue(venue)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"สร้างดัชนีค้นหาใหม่แล้ว {count} สถานที่"))
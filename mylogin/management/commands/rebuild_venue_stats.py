@@ -0,0 +1,56 @@
+# mylogin/management/commands/rebuild_venue_stats.py
+from django.core.management.base import BaseCommand
+
+from mylogin.leaderboards import refresh_leaderboards
+from mylogin.models import Venue, VenueStats
+from mylogin.venue_stats import compute_stats
+
+
+class Command(BaseCommand):
+    help = "คำนวณตัวนับ VenueStats ใหม่จากข้อมูลจริง และรายงานสถานที่ที่ค่าเพี้ยน"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="รายงานค่าเพี้ยนอย่างเดียว ไม่บันทึก")
+        parser.add_argument("--venue", type=int, action="append", help="ทำเฉพาะ venue_id ที่ระบุ (ใส่ซ้ำได้)")
+
+    def handle(self, *args, **options):
+        venue_ids = options["venue"]
+        venues = Venue.objects.all()
+        if venue_ids:
+            venues = venues.filter(venue_id__in=venue_ids)
+
+        expected = compute_stats(venue_ids)
+        current = {s.venue_id: s for s in VenueStats.objects.filter(venue__in=venues)}
+        zero = {field: 0 for field in VenueStats.COUNTER_FIELDS}
+
+        missing, drifted = [], []
+        for venue_id in venues.values_list("venue_id", flat=True).iterator():
+            want = expected.get(venue_id, zero)
+            stats = current.get(venue_id)
+            if stats is None:
+                missing.append(VenueStats(venue_id=venue_id, **want))
+                continue
+
+            diff = {
+                field: (getattr(stats, field), value)
+                for field, value in want.items()
+                if getattr(stats, field) != value
+            }
+            if diff:
+                drifted.append(stats)
+                for field, (old, new) in diff.items():
+                    setattr(stats, field, new)
+                changes = ", ".join(f"{field} {old}→{new}" for field, (old, new) in diff.items())
+                self.stdout.write(self.style.WARNING(f"venue {venue_id}: {changes}"))
+
+        self.stdout.write(
+            f"ตรวจ {len(current) + len(missing)} สถานที่: ไม่มีแถวสถิติ {len(missing)}, ค่าเพี้ยน {len(drifted)}"
+        )
+        if options["dry_run"]:
+            return
+
+        VenueStats.objects.bulk_create(missing, batch_size=1000)
+        VenueStats.objects.bulk_update(drifted, VenueStats.COUNTER_FIELDS, batch_size=1000)
+        if missing or drifted:
+            refresh_leaderboards()
+        self.stdout.write(self.style.SUCCESS("บันทึกตัวนับใหม่เรียบร้อย"))
@@ -0,0 +1,25 @@
+# mylogin/management/commands/refresh_leaderboards.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from mylogin.leaderboards import refresh_leaderboards
+
+
+class Command(BaseCommand):
+    help = "คำนวณอันดับสถานที่ยอดฮิต (จองสำเร็จ / กิจกรรม / รีวิว) ใหม่ทั้งหมด"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="ทำงานวนไปเรื่อย ๆ ตามช่วงเวลา --interval")
+        parser.add_argument("--interval", type=int, default=600, help="จำนวนวินาทีระหว่างรอบ (ค่าเริ่มต้น 600)")
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            refresh_leaderboards()
+            elapsed_ms = (time.monotonic() - started) * 1000
+            self.stdout.write(self.style.SUCCESS(f"อัปเดตอันดับสถานที่ยอดฮิตแล้ว ({elapsed_ms:.0f} ms)"))
+
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
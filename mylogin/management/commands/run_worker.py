@@ -0,0 +1,78 @@
+# mylogin/management/commands/run_worker.py
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+# หมายเหตุ: ห้าม import models/mylogin.tasks ที่ระดับ module
+# process ลูก (spawn) จะ import module นี้ก่อน django.setup() ใน _init_child
+
+
+def _init_child():
+    # process ลูกเริ่มแบบ spawn (ไม่แชร์ connection DB กับ process หลัก) จึงต้อง setup Django เอง
+    django.setup()
+
+
+def _execute_in_child(name, kwargs):
+    from mylogin.tasks import execute
+
+    return execute(name, kwargs)
+
+
+class Command(BaseCommand):
+    help = "ประมวลผลงานเบื้องหลังจากตาราง BackgroundTask (รูปภาพ/สลิป/QR) ด้วย process pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=min(4, os.cpu_count() or 1),
+                            help="จำนวน process ที่ใช้ประมวลผล (ค่าเริ่มต้น min(4, จำนวน CPU))")
+        parser.add_argument("--batch", type=int, default=20, help="จำนวนงานที่จองต่อรอบ")
+        parser.add_argument("--sleep", type=float, default=2.0, help="วินาทีที่รอเมื่อไม่มีงานในคิว")
+        parser.add_argument("--once", action="store_true", help="ทำงานที่ค้างในคิวจนหมดแล้วจบ (ไม่วนรอ)")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"worker เริ่มทำงาน ({options['processes']} processes)")
+        while True:
+            # process ลูกตาย (เช่นโดน OOM kill) → pool ใช้ต่อไม่ได้ สร้างใหม่แล้วทำต่อ
+            try:
+                self._run(options)
+                return
+            except BrokenProcessPool:
+                self.stdout.write(self.style.WARNING("process pool เสีย สร้างใหม่"))
+
+    def _run(self, options):
+        from mylogin.tasks import claim_tasks, finish_task, prune_finished
+
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=options["processes"], mp_context=context,
+                                 initializer=_init_child) as pool:
+            while True:
+                close_old_connections()
+                tasks = claim_tasks(options["batch"])
+                if not tasks:
+                    pruned = prune_finished()
+                    if pruned:
+                        self.stdout.write(f"ลบงานเก่าที่จบแล้ว {pruned} รายการ")
+                    if options["once"]:
+                        return
+                    time.sleep(options["sleep"])
+                    continue
+
+                futures = [(t, pool.submit(_execute_in_child, t.name, t.kwargs)) for t in tasks]
+                broken = None
+                for t, future in futures:
+                    try:
+                        error = future.result()
+                    except BrokenProcessPool as exc:
+                        error, broken = repr(exc), exc
+                    finish_task(t, error)
+                    if error is None:
+                        self.stdout.write(self.style.SUCCESS(f"✓ {t.name} #{t.pk}"))
+                    else:
+                        self.stdout.write(self.style.ERROR(f"✗ {t.name} #{t.pk}: {error.strip().splitlines()[-1]}"))
+                if broken is not None:
+                    raise broken
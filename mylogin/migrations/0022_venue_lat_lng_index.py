@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mylogin', '0021_activity_created_at_activity_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='venue',
+            index=models.Index(fields=['latitude', 'longitude'], name='venue_lat_lng_idx'),
+        ),
+    ]
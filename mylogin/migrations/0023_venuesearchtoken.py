@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:56
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# สำเนาของการแตก token ใน mylogin/search.py ณ ตอนสร้าง migration นี้
+# (ไม่ import จากโค้ดของแอป เพื่อให้ผลของ migration ไม่เปลี่ยนตามโค้ดในอนาคต)
+FIELD_WEIGHTS = {
+    "name": 4,
+    "address": 3,
+    "extra_amenities": 2,
+    "description": 1,
+}
+TOKEN_MAX_LENGTH = 64
+_RUN_RE = re.compile(r"[\u0e00-\u0e7f]+|[a-z0-9]+")
+
+
+def tokenize(text):
+    tokens = []
+    for run in _RUN_RE.findall((text or "").lower()):
+        if "\u0e00" <= run[0] <= "\u0e7f":
+            tokens.extend([run] if len(run) == 1 else [run[i:i + 2] for i in range(len(run) - 1)])
+        else:
+            tokens.append(run[:TOKEN_MAX_LENGTH])
+    return tokens
+
+
+def venue_token_weights(venue):
+    weights = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        for token in set(tokenize(getattr(venue, field, ""))):
+            weights[token] = weights.get(token, 0) + weight
+    return weights
+
+
+def build_search_index(apps, schema_editor):
+    Venue = apps.get_model('mylogin', 'Venue')
+    VenueSearchToken = apps.get_model('mylogin', 'VenueSearchToken')
+    for venue in Venue.objects.all().iterator(chunk_size=500):
+        VenueSearchToken.objects.bulk_create([
+            VenueSearchToken(venue_id=venue.pk, token=token, weight=weight)
+            for token, weight in venue_token_weights(venue).items()
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mylogin', '0022_venue_lat_lng_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VenueSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('venue', models.ForeignKey(db_column='venue_id', on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='mylogin.venue')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['token', 'venue'], name='venue_search_token_idx')],
+                'constraints': [models.UniqueConstraint(fields=('venue', 'token'), name='unique_venue_search_token')],
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:57
+
+from django.db import migrations, models
+
+# ต้องตรงกับ VenueAmenity.AMENITY_FIELDS ณ ตอนสร้าง migration นี้
+AMENITY_FIELDS = [
+    "wifi", "parking", "equipment", "sound_system", "projector",
+    "air_conditioning", "seating", "drinking_water", "first_aid", "cctv"
+]
+
+
+def backfill_amenity_mask(apps, schema_editor):
+    Venue = apps.get_model('mylogin', 'Venue')
+    VenueAmenity = apps.get_model('mylogin', 'VenueAmenity')
+    for amenity in VenueAmenity.objects.all().iterator(chunk_size=500):
+        mask = 0
+        for bit, field in enumerate(AMENITY_FIELDS):
+            if getattr(amenity, field):
+                mask |= 1 << bit
+        if mask:
+            Venue.objects.filter(pk=amenity.venue_id).update(amenity_mask=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mylogin', '0023_venuesearchtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venue',
+            name='amenity_mask',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(backfill_amenity_mask, migrations.RunPython.noop),
+    ]
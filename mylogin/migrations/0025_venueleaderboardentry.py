@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mylogin', '0024_venue_amenity_mask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VenueLeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('completed_booking', 'จองสำเร็จมากที่สุด'), ('activity', 'จัดกิจกรรมมากที่สุด'), ('review', 'รีวิวดีที่สุด')], max_length=20)),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField(default=0)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('venue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='mylogin.venue')),
+            ],
+            options={
+                'ordering': ['kind', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'rank'), name='unique_leaderboard_kind_rank')],
+            },
+        ),
+    ]
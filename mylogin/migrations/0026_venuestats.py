@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_venue_stats(apps, schema_editor):
+    Venue = apps.get_model('mylogin', 'Venue')
+    VenueStats = apps.get_model('mylogin', 'VenueStats')
+    Review = apps.get_model('mylogin', 'Review')
+    Booking = apps.get_model('mylogin', 'Booking')
+    Favorite = apps.get_model('mylogin', 'Favorite')
+    Activity = apps.get_model('mylogin', 'Activity')
+
+    stats = {vid: VenueStats(venue_id=vid) for vid in Venue.objects.values_list('venue_id', flat=True)}
+
+    for row in Review.objects.values('venue_id').annotate(s=Sum('rating'), c=Count('id')).order_by():
+        stats[row['venue_id']].rating_sum = row['s'] or 0
+        stats[row['venue_id']].rating_count = row['c']
+    bookings = (
+        Booking.objects.values('venue_id')
+        .annotate(c=Count('booking_id'), done=Count('booking_id', filter=Q(status='completed')))
+        .order_by()
+    )
+    for row in bookings:
+        stats[row['venue_id']].booking_count = row['c']
+        stats[row['venue_id']].completed_booking_count = row['done']
+    for row in Favorite.objects.values('venue_id').annotate(c=Count('id')).order_by():
+        stats[row['venue_id']].favorite_count = row['c']
+    for row in Activity.objects.values('booking__venue_id').annotate(c=Count('activity_id')).order_by():
+        stats[row['booking__venue_id']].activity_count = row['c']
+
+    VenueStats.objects.bulk_create(stats.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mylogin', '0025_venueleaderboardentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VenueStats',
+            fields=[
+                ('venue', models.OneToOneField(db_column='venue_id', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='mylogin.venue')),
+                ('rating_sum', models.IntegerField(default=0)),
+                ('rating_count', models.IntegerField(default=0)),
+                ('booking_count', models.IntegerField(default=0)),
+                ('completed_booking_count', models.IntegerField(default=0)),
+                ('activity_count', models.IntegerField(default=0)),
+                ('favorite_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_venue_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:04
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mylogin', '0026_venuestats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venueimage',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='venueimage',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'รอประมวลผล'), ('processing', 'กำลังประมวลผล'), ('ready', 'พร้อมใช้งาน'), ('failed', 'ประมวลผลไม่สำเร็จ')], default='pending', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='BackgroundTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('kwargs', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('queued', 'รอทำงาน'), ('running', 'กำลังทำงาน'), ('done', 'สำเร็จ'), ('failed', 'ล้มเหลว')], default='queued', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=3)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['run_after', 'id'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='bgtask_status_run_after_idx')],
+            },
+        ),
+    ]
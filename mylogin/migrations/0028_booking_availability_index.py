@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mylogin', '0027_backgroundtask_venueimage_processing'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['venue', 'status', 'start_date', 'end_date'], name='booking_availability_idx'),
+        ),
+    ]
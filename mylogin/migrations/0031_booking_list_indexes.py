@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mylogin', '0030_booking_expiry_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', 'status', 'created_at', 'booking_id'], name='booking_user_list_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['venue', 'status', 'created_at', 'booking_id'], name='booking_venue_list_idx'),
+        ),
+    ]
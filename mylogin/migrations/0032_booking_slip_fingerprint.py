@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mylogin', '0031_booking_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='slip_dhash',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='slip_duplicate_kind',
+            field=models.CharField(blank=True, choices=[('', 'ไม่ซ้ำ'), ('exact', 'ไฟล์เดียวกัน'), ('near', 'ภาพใกล้เคียงกัน')], max_length=10),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='slip_duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='mylogin.booking'),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='slip_hash_band0',
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='slip_hash_band1',
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='slip_hash_band2',
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='slip_hash_band3',
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='slip_sha256',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mylogin', '0032_booking_slip_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChannelLayerGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('group', models.CharField(max_length=100)),
+                ('channel', models.CharField(max_length=100)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('group', 'channel'), name='chlayer_group_channel_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ChannelLayerMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('inbox', models.CharField(max_length=100)),
+                ('channels', models.JSONField(default=list)),
+                ('payload', models.TextField()),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['inbox', 'id'], name='chlayer_msg_inbox_idx')],
+            },
+        ),
+    ]
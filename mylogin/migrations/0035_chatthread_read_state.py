@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:23
+
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+
+def mark_existing_messages_read(apps, schema_editor):
+    # ก่อนหน้านี้ไม่มีการบันทึกสถานะการอ่าน → ถือว่าข้อความเดิมทั้งหมดอ่านแล้ว (ไม่ให้ทุกห้องขึ้น badge ค้าง)
+    ChatThread = apps.get_model('mylogin', 'ChatThread')
+    ChatMessage = apps.get_model('mylogin', 'ChatMessage')
+    latest = (
+        ChatMessage.objects.filter(thread_id=OuterRef('pk'))
+        .order_by().values('thread_id').annotate(m=Max('id')).values('m')
+    )
+    ChatThread.objects.filter(messages__isnull=False).distinct().update(
+        customer_last_read_id=Subquery(latest),
+        owner_last_read_id=Subquery(latest),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mylogin', '0034_chatmessage_thread_ts_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatthread',
+            name='customer_last_read_id',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='chatthread',
+            name='customer_unread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='chatthread',
+            name='owner_last_read_id',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='chatthread',
+            name='owner_unread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(mark_existing_messages_read, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+
+def backfill_last_message(apps, schema_editor):
+    ChatThread = apps.get_model('mylogin', 'ChatThread')
+    ChatMessage = apps.get_model('mylogin', 'ChatMessage')
+    latest = (
+        ChatMessage.objects.filter(thread_id=OuterRef('pk'))
+        .order_by().values('thread_id').annotate(m=Max('id')).values('m')
+    )
+    ChatThread.objects.update(last_message_id=Subquery(latest))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mylogin', '0035_chatthread_read_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatthread',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='mylogin.chatmessage'),
+        ),
+        migrations.AddIndex(
+            model_name='chatthread',
+            index=models.Index(fields=['customer', 'updated_at', 'id'], name='chatthread_customer_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatthread',
+            index=models.Index(fields=['owner', 'updated_at', 'id'], name='chatthread_owner_inbox_idx'),
+        ),
+        migrations.RunPython(backfill_last_message, migrations.RunPython.noop),
+    ]
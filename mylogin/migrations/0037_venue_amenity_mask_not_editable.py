@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mylogin', '0036_chatthread_last_message'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='venue',
+            name='amenity_mask',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -1,7 +1,9 @@
+from collections import namedtuple
 from datetime import datetime
 from time import timezone
 from django.contrib.auth.models import AbstractUser, BaseUserManager
-from django.db import models
+from django.db import models, transaction
+from django.dispatch import Signal
 from django.conf import settings
 from openlocationcode import openlocationcode as olc
 from django.utils import timezone
@@ -60,6 +62,11 @@ class Venue(models.Model):
     extra_amenities = models.TextField(blank=True)
     max_capacity = models.PositiveIntegerField(null=True, blank=True, help_text="จำนวนผู้เข้าร่วมสูงสุดที่รองรับ")
 
+    # bitmask ของ VenueAmenity (bit ตามลำดับ VenueAmenity.AMENITY_FIELDS) ใช้กรองโดยไม่ต้อง join
+    # เขียนจาก VenueAmenity.save / signal เท่านั้น (ไม่ให้ฟอร์ม/admin เขียนค่าเก่าทับ)
+    # ไม่มี index: เงื่อนไข bitand(amenity_mask, required) = required ใช้ B-tree index ไม่ได้ DB ต้องสแกนอยู่ดี
+    amenity_mask = models.PositiveIntegerField(default=0, editable=False)
+
     code = models.CharField(max_length=32, blank=True)
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
@@ -73,6 +80,12 @@ class Venue(models.Model):
         related_name='venues'
     )
 
+    class Meta:
+        indexes = [
+            # ใช้กับการค้นหา "ใกล้ฉัน": กรองกรอบ lat/lng ใน DB ก่อนคำนวณระยะจริง
+            models.Index(fields=['latitude', 'longitude'], name='venue_lat_lng_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         # ตั้ง Plus Code อัตโนมัติจาก lat/lng เสมอเมื่อมีพิกัด
         if self.latitude is not None and self.longitude is not None:
@@ -85,9 +98,21 @@ class Venue(models.Model):
     def __str__(self):
         return f"{self.name} ({self.code})" if self.code else self.name
 
+    @property
+    def cover_image(self):
+        """
+        รูปแรกของสถานที่ (เรียงตาม order, id)
+        ถ้า queryset ทำ prefetch_related('images') ไว้แล้วจะใช้ผลที่ prefetch (ไม่ยิง query เพิ่มต่อแถว)
+        """
+        prefetched = getattr(self, '_prefetched_objects_cache', {}).get('images')
+        if prefetched is not None:
+            images = list(prefetched)
+            return images[0] if images else None
+        return self.images.order_by('order', 'id').first()  # type: ignore
+
     @property
     def cover_image_url(self):
-        first = self.images.order_by('order', 'id').first()  # type: ignore
+        first = self.cover_image
         return first.image.url if first else None
 
 
@@ -109,10 +134,56 @@ class VenueAmenity(models.Model):
     first_aid = models.BooleanField(default=False)
     cctv = models.BooleanField(default=False)
 
+    # ลำดับนี้คือตำแหน่ง bit ใน Venue.amenity_mask — เพิ่มใหม่ต่อท้ายเท่านั้น ห้ามสลับลำดับ
+    AMENITY_FIELDS = [
+        "wifi", "parking", "equipment", "sound_system", "projector",
+        "air_conditioning", "seating", "drinking_water", "first_aid", "cctv"
+    ]
+
+    @classmethod
+    def mask_for(cls, fields):
+        """แปลงรายชื่อ amenity เป็น bitmask"""
+        mask = 0
+        for field in fields:
+            mask |= 1 << cls.AMENITY_FIELDS.index(field)
+        return mask
+
+    @property
+    def mask(self):
+        return self.mask_for([f for f in self.AMENITY_FIELDS if getattr(self, f)])
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # sync bitmask ไปที่ Venue ทุกครั้งที่บันทึก amenity
+        Venue.objects.filter(pk=self.venue_id).update(amenity_mask=self.mask)
+
     def __str__(self):
         return f"Amenities for {self.venue.name}"
 
 
+class VenueSearchToken(models.Model):
+    """ดัชนีค้นหาข้อความของ Venue (ดู mylogin/search.py) — 1 แถวต่อ 1 token ต่อสถานที่"""
+    venue = models.ForeignKey(
+        Venue,
+        on_delete=models.CASCADE,
+        related_name='search_tokens',
+        db_column='venue_id'
+    )
+    token = models.CharField(max_length=64)
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['venue', 'token'], name='unique_venue_search_token')
+        ]
+        indexes = [
+            models.Index(fields=['token', 'venue'], name='venue_search_token_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.token} → {self.venue_id} ({self.weight})"
+
+
 class VenueImage(models.Model):
     venue = models.ForeignKey(
         Venue,
@@ -120,9 +191,20 @@ class VenueImage(models.Model):
         related_name='images',
         db_column='venue_id'
     )
+    PROCESSING_CHOICES = [
+        ('pending', 'รอประมวลผล'),
+        ('processing', 'กำลังประมวลผล'),
+        ('ready', 'พร้อมใช้งาน'),
+        ('failed', 'ประมวลผลไม่สำเร็จ'),
+    ]
+
     image = models.ImageField(upload_to='venue_images/')
     order = models.PositiveIntegerField(null=True, blank=True)
 
+    # สถานะการประมวลผลรูปเบื้องหลัง (ลบ EXIF/ย่อขนาด/สร้าง thumbnail) ดู mylogin/image_tasks.py
+    processing_status = models.CharField(max_length=20, choices=PROCESSING_CHOICES, default='pending')
+    processed_at = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         ordering = ['order', 'id']
 
@@ -130,6 +212,68 @@ class VenueImage(models.Model):
         return f"Image of {self.venue.name} (order {self.order})"
 
 
+class VenueStats(models.Model):
+    """
+    ตัวนับสถิติของ Venue ที่อัปเดตทีละขั้นด้วย F() (ดู mylogin/venue_stats.py)
+    ใช้แทนการ Avg/Count join ในหน้า list/อันดับ — ตรวจและแก้ค่าเพี้ยนด้วย manage.py rebuild_venue_stats
+    """
+    venue = models.OneToOneField(
+        Venue,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        db_column='venue_id'
+    )
+    rating_sum = models.IntegerField(default=0)
+    rating_count = models.IntegerField(default=0)
+    booking_count = models.IntegerField(default=0)
+    completed_booking_count = models.IntegerField(default=0)
+    activity_count = models.IntegerField(default=0)
+    favorite_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    COUNTER_FIELDS = [
+        "rating_sum", "rating_count", "booking_count",
+        "completed_booking_count", "activity_count", "favorite_count",
+    ]
+
+    @property
+    def avg_rating(self):
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
+    def __str__(self):
+        return f"Stats for venue {self.venue_id}"
+
+
+class VenueLeaderboardEntry(models.Model):
+    """อันดับสถานที่ยอดฮิตที่คำนวณไว้ล่วงหน้า (ดู mylogin/leaderboards.py)"""
+    KIND_CHOICES = [
+        ('completed_booking', 'จองสำเร็จมากที่สุด'),
+        ('activity', 'จัดกิจกรรมมากที่สุด'),
+        ('review', 'รีวิวดีที่สุด'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    rank = models.PositiveSmallIntegerField()
+    venue = models.ForeignKey(Venue, on_delete=models.CASCADE, related_name='+')
+
+    # completed_booking/activity → score = จำนวนครั้ง, review → score = คะแนนเฉลี่ย, count = จำนวนรีวิว
+    score = models.FloatField(default=0)
+    count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'rank'], name='unique_leaderboard_kind_rank')
+        ]
+        ordering = ['kind', 'rank']
+
+    def __str__(self):
+        return f"{self.kind} #{self.rank}: {self.venue_id} ({self.score})"
+
+
 class Booking(models.Model):
     STATUS_CHOICES = [
         ('pending', 'รออนุมัติ'),
@@ -160,13 +304,134 @@ class Booking(models.Model):
     approved_at = models.DateTimeField(blank=True, null=True)
     slip_uploaded_at = models.DateTimeField(blank=True, null=True)
     completed_at = models.DateTimeField(blank=True, null=True)
+    rejected_at = models.DateTimeField(blank=True, null=True)
+    cancelled_at = models.DateTimeField(blank=True, null=True)
+
+    # ลายนิ้วมือสลิป ใช้ตรวจสลิปที่ถูกส่งซ้ำ (ดู mylogin/slip_fingerprint.py)
+    SLIP_DUPLICATE_CHOICES = [
+        ('', 'ไม่ซ้ำ'),
+        ('exact', 'ไฟล์เดียวกัน'),
+        ('near', 'ภาพใกล้เคียงกัน'),
+    ]
+    slip_sha256 = models.CharField(max_length=64, blank=True, db_index=True)
+    slip_dhash = models.BigIntegerField(blank=True, null=True)
+    slip_hash_band0 = models.PositiveIntegerField(blank=True, null=True, db_index=True)
+    slip_hash_band1 = models.PositiveIntegerField(blank=True, null=True, db_index=True)
+    slip_hash_band2 = models.PositiveIntegerField(blank=True, null=True, db_index=True)
+    slip_hash_band3 = models.PositiveIntegerField(blank=True, null=True, db_index=True)
+    slip_duplicate_of = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, blank=True, null=True, related_name='+',
+    )
+    slip_duplicate_kind = models.CharField(max_length=10, choices=SLIP_DUPLICATE_CHOICES, blank=True)
+
+    # สถานะปัจจุบัน → สถานะที่เปลี่ยนไปได้
+    TRANSITIONS = {
+        'pending': ('approved', 'rejected', 'cancelled'),
+        'approved': ('awaiting_confirmation', 'rejected', 'cancelled'),
+        'awaiting_confirmation': ('completed', 'rejected', 'cancelled'),
+        'completed': (),
+        'rejected': (),
+        'cancelled': (),
+    }
+
+    # ฟิลด์เวลาที่ถูกบันทึกเมื่อเข้าสู่สถานะนั้น
+    TIMESTAMP_FIELDS = {
+        'approved': 'approved_at',
+        'awaiting_confirmation': 'slip_uploaded_at',
+        'completed': 'completed_at',
+        'rejected': 'rejected_at',
+        'cancelled': 'cancelled_at',
+    }
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # ตรวจการจองซ้อน/ช่วงเวลาว่าง (ดู mylogin/availability.py)
+            models.Index(fields=['venue', 'status', 'start_date', 'end_date'], name='booking_availability_idx'),
+            # ค้นการจองที่ค้างเกินกำหนด (ดู mylogin/booking_expiry.py)
+            models.Index(fields=['status', 'created_at'], name='booking_status_created_idx'),
+            models.Index(fields=['status', 'approved_at'], name='booking_status_approved_idx'),
+            # หน้ารายการจอง: แท็บสถานะ + แบ่งหน้าแบบ keyset (ดู mylogin/pagination.py)
+            models.Index(fields=['user', 'status', 'created_at', 'booking_id'], name='booking_user_list_idx'),
+            models.Index(fields=['venue', 'status', 'created_at', 'booking_id'], name='booking_venue_list_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.email} จอง {self.venue.name} [{self.start_date} - {self.end_date}]"
 
+    # ========================================
+    # เปลี่ยนสถานะ (ใช้แทนการตั้ง status แล้ว save)
+    # ========================================
+    @classmethod
+    def sources_for(cls, new_status):
+        """สถานะที่เปลี่ยนมาเป็น new_status ได้"""
+        return [status for status, targets in cls.TRANSITIONS.items() if new_status in targets]
+
+    @classmethod
+    def _transition_values(cls, new_status, fields):
+        values = {'status': new_status, **fields}
+        timestamp_field = cls.TIMESTAMP_FIELDS.get(new_status)
+        if timestamp_field:
+            values[timestamp_field] = timezone.now()
+        return values
+
+    def can_transition(self, new_status):
+        return new_status in self.TRANSITIONS.get(self.status, ())
+
+    def transition_to(self, new_status, **fields):
+        """
+        เปลี่ยนสถานะเป็น new_status (พร้อมบันทึกเวลาและ fields เพิ่มเติม)
+        ใช้ UPDATE ... WHERE status=<สถานะที่โหลดมา> ถ้ามีคนเปลี่ยนสถานะไปก่อนแล้วจะไม่ทับ และคืน False
+        """
+        if not self.can_transition(new_status):
+            return False
+
+        old_status = self.status
+        values = self._transition_values(new_status, fields)
+        updated = Booking.objects.filter(pk=self.pk, status=old_status).update(**values)
+        if not updated:
+            return False
+
+        for field, value in values.items():
+            setattr(self, field, value)
+        # ให้ post_save ของ save() ครั้งถัดไปรู้ว่าสถานะนี้ถูกนับไปแล้ว (ดู signals.py)
+        self._loaded_status = new_status
+        booking_status_changed.send(sender=Booking, changes=[
+            BookingStatusChange(self.pk, self.venue_id, old_status, new_status, self.start_date, self.end_date)
+        ])
+        return True
+
+    @classmethod
+    def bulk_transition(cls, queryset, new_status, **fields):
+        """
+        เปลี่ยนสถานะของทุก booking ใน queryset ที่อยู่ในสถานะที่เปลี่ยนได้ ด้วย UPDATE เดียว
+        รายการที่สถานะเปลี่ยนไปแล้ว (เช่นถูกยกเลิกระหว่างนั้น) จะถูกข้าม — คืน list ของ pk ที่เปลี่ยนสำเร็จ
+        """
+        sources = cls.sources_for(new_status)
+        with transaction.atomic():
+            rows = list(
+                queryset.filter(status__in=sources)
+                .select_for_update(of=('self',))
+                .values_list('pk', 'venue_id', 'status', 'start_date', 'end_date')
+            )
+            if not rows:
+                return []
+            pks = [row[0] for row in rows]
+            cls.objects.filter(pk__in=pks, status__in=sources).update(**cls._transition_values(new_status, fields))
+            booking_status_changed.send(sender=cls, changes=[
+                BookingStatusChange(pk, venue_id, old_status, new_status, start_date, end_date)
+                for pk, venue_id, old_status, start_date, end_date in rows
+            ])
+        return pks
+
+
+# ส่งเมื่อสถานะ Booking ถูกเปลี่ยนด้วย transition_to/bulk_transition (ซึ่งใช้ queryset.update จึงไม่มี post_save)
+# receiver ได้ changes = [BookingStatusChange, ...]
+BookingStatusChange = namedtuple(
+    'BookingStatusChange', 'booking_id venue_id old_status new_status start_date end_date'
+)
+booking_status_changed = Signal()
+
 
 class Activity(models.Model):
     activity_id = models.AutoField(primary_key=True)
@@ -369,6 +634,22 @@ class ChatThread(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # สถานะการอ่านของแต่ละฝั่ง (ดู mylogin/chat.py)
+    # *_last_read_id = id ของข้อความล่าสุดที่ฝั่งนั้นอ่านแล้ว, *_unread_count = ข้อความจากอีกฝั่งที่ยังไม่อ่าน
+    customer_last_read_id = models.PositiveIntegerField(default=0)
+    owner_last_read_id = models.PositiveIntegerField(default=0)
+    customer_unread_count = models.PositiveIntegerField(default=0)
+    owner_unread_count = models.PositiveIntegerField(default=0)
+
+    # ข้อความล่าสุด (ตัวอย่างในหน้ารวมแชท) อัปเดตพร้อม updated_at ตอนบันทึกข้อความ
+    last_message = models.ForeignKey(
+        'ChatMessage',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -376,6 +657,11 @@ class ChatThread(models.Model):
                 name='unique_chat_thread_per_venue_customer_owner'
             )
         ]
+        indexes = [
+            # หน้ารวมแชทแบบ keyset เรียงตาม updated_at (ดู chat_history)
+            models.Index(fields=['customer', 'updated_at', 'id'], name='chatthread_customer_inbox_idx'),
+            models.Index(fields=['owner', 'updated_at', 'id'], name='chatthread_owner_inbox_idx'),
+        ]
 
     def __str__(self):
         return f"Chat {self.customer} ↔ {self.owner} @ {self.venue}"
@@ -396,6 +682,12 @@ class ChatMessage(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # ประวัติแชทแบบ keyset (ดู mylogin/chat.py)
+            models.Index(fields=['thread', 'timestamp', 'id'], name='chatmsg_thread_ts_idx'),
+        ]
+
     @property
     def receiver(self):
         # อีกฝั่งของคนส่งใน thread นี้
@@ -456,3 +748,71 @@ class Favorite(models.Model):
 
     def __str__(self):
         return f"{self.user.email} ♥ {self.venue.name}"
+
+
+class BackgroundTask(models.Model):
+    """
+    คิวงานเบื้องหลังที่เก็บในฐานข้อมูล (ไม่ต้องมี broker แยก)
+    สร้างด้วย mylogin.tasks.enqueue() และประมวลผลโดย manage.py run_worker
+    """
+    STATUS_CHOICES = [
+        ('queued', 'รอทำงาน'),
+        ('running', 'กำลังทำงาน'),
+        ('done', 'สำเร็จ'),
+        ('failed', 'ล้มเหลว'),
+    ]
+
+    name = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='bgtask_status_run_after_idx'),
+        ]
+        ordering = ['run_after', 'id']
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+class ChannelLayerMessage(models.Model):
+    """
+    ข้อความที่รอส่งของ DatabaseChannelLayer (mylogin/channel_layer.py)
+    inbox = ชื่อ channel ร่วม หรือส่วน "specific.<process>!" ของ channel เฉพาะ process
+    หนึ่งแถวอาจส่งถึงหลาย channel ใน process เดียวกัน (group_send รวมเป็นแถวเดียวต่อ process)
+    """
+    inbox = models.CharField(max_length=100)
+    channels = models.JSONField(default=list)
+    payload = models.TextField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['inbox', 'id'], name='chlayer_msg_inbox_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.inbox} #{self.pk}"
+
+
+class ChannelLayerGroup(models.Model):
+    """สมาชิกของ group ใน DatabaseChannelLayer"""
+    group = models.CharField(max_length=100)
+    channel = models.CharField(max_length=100)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['group', 'channel'], name='chlayer_group_channel_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.group} → {self.channel}"
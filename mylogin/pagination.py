@@ -0,0 +1,85 @@
+# mylogin/pagination.py
+"""
+แบ่งหน้าแบบ keyset (cursor) สำหรับรายการที่เรียงใหม่ → เก่าด้วย (created_at, pk)
+ต่างจาก Paginator ของ Django ตรงที่ไม่ต้อง COUNT(*) และไม่ใช้ OFFSET
+→ ทุกหน้าใช้ query เดียวและเร็วเท่ากันไม่ว่าจะอยู่หน้าไหน
+
+cursor เป็น base64 ของ "<created_at iso>|<pk>" ของแถวสุดท้าย/แรกของหน้า
+cursor ที่อ่านไม่ได้ถือว่าเป็นหน้าแรก
+"""
+import base64
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, prev_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor  # หน้าถัดไป (เก่ากว่า)
+        self.prev_cursor = prev_cursor  # หน้าก่อนหน้า (ใหม่กว่า)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_other_pages(self):
+        return bool(self.next_cursor or self.prev_cursor)
+
+
+def encode_cursor(obj, time_field="created_at"):
+    raw = f"{getattr(obj, time_field).isoformat()}|{obj.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """คืน (datetime, pk) หรือ None ถ้า cursor ไม่ถูกต้อง"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        stamp, pk = raw.rsplit("|", 1)
+        when = parse_datetime(stamp)
+        return (when, int(pk)) if when is not None else None
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def keyset_page(queryset, per_page, after=None, before=None, time_field="created_at"):
+    """
+    คืน KeysetPage ของ queryset เรียง (time_field, pk) จากใหม่ไปเก่า
+    after  = cursor ที่ได้จาก next_cursor → หน้าที่เก่ากว่า
+    before = cursor ที่ได้จาก prev_cursor → หน้าที่ใหม่กว่า
+    ดึง per_page + 1 แถวเพื่อรู้ว่ามีหน้าต่อไปหรือไม่ (query เดียว)
+    """
+    pk_name = queryset.model._meta.pk.name
+    after, before = decode_cursor(after), decode_cursor(before)
+
+    if before is not None:
+        when, pk = before
+        rows = list(
+            queryset.filter(Q(**{f"{time_field}__gt": when}) | Q(**{time_field: when, f"{pk_name}__gt": pk}))
+            .order_by(time_field, pk_name)[:per_page + 1]
+        )
+        has_more = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_newer, has_older = has_more, True
+    else:
+        if after is not None:
+            when, pk = after
+            queryset = queryset.filter(Q(**{f"{time_field}__lt": when}) | Q(**{time_field: when, f"{pk_name}__lt": pk}))
+        rows = list(queryset.order_by(f"-{time_field}", f"-{pk_name}")[:per_page + 1])
+        has_older = len(rows) > per_page
+        rows = rows[:per_page]
+        has_newer = after is not None
+
+    if not rows:
+        return KeysetPage([])
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor(rows[-1], time_field) if has_older else None,
+        prev_cursor=encode_cursor(rows[0], time_field) if has_newer else None,
+    )
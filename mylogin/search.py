@@ -0,0 +1,111 @@
+# mylogin/search.py
+"""
+ดัชนีค้นหาข้อความของสถานที่ (inverted index ในตาราง VenueSearchToken)
+
+- ภาษาไทย: ไม่มีช่องว่างระหว่างคำ จึงแตกเป็น bigram ของตัวอักษร (กรุงเทพ → กร, รุ, ุง, ...)
+- ภาษาอังกฤษ/ตัวเลข: แตกเป็นคำ (ตัวพิมพ์เล็ก) และค้นแบบขึ้นต้นด้วย (prefix)
+- คะแนน (weight) ของ token = ผลรวมน้ำหนักของฟิลด์ที่พบ token นั้น
+"""
+import re
+from functools import reduce
+from operator import or_
+
+from django.db.models import Case, IntegerField, Max, Q, Sum, When
+
+# น้ำหนักของแต่ละฟิลด์ที่นำมาทำดัชนี
+FIELD_WEIGHTS = {
+    "name": 4,
+    "address": 3,
+    "extra_amenities": 2,
+    "description": 1,
+}
+
+TOKEN_MAX_LENGTH = 64
+MAX_QUERY_TOKENS = 16
+
+_RUN_RE = re.compile(r"[\u0e00-\u0e7f]+|[a-z0-9]+")
+
+
+def _is_thai(run):
+    return "\u0e00" <= run[0] <= "\u0e7f"
+
+
+def _thai_bigrams(run):
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def tokenize(text):
+    """แตกข้อความเป็น token สำหรับเก็บในดัชนี (ซ้ำได้)"""
+    tokens = []
+    for run in _RUN_RE.findall((text or "").lower()):
+        if _is_thai(run):
+            tokens.extend(_thai_bigrams(run))
+        else:
+            tokens.append(run[:TOKEN_MAX_LENGTH])
+    return tokens
+
+
+def venue_token_weights(venue):
+    """คืน {token: weight} ของสถานที่หนึ่งแห่ง"""
+    weights = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        for token in set(tokenize(getattr(venue, field, ""))):
+            weights[token] = weights.get(token, 0) + weight
+    return weights
+
+
+def index_venue(venue):
+    """สร้าง token ของสถานที่นี้ใหม่ทั้งหมด (เรียกหลัง Venue.save)"""
+    from mylogin.models import VenueSearchToken
+
+    VenueSearchToken.objects.filter(venue_id=venue.pk).delete()
+    VenueSearchToken.objects.bulk_create([
+        VenueSearchToken(venue_id=venue.pk, token=token, weight=weight)
+        for token, weight in venue_token_weights(venue).items()
+    ])
+
+
+def query_conditions(query, field="search_tokens__token"):
+    """
+    แปลงคำค้นเป็นรายการเงื่อนไข Q (ทุกเงื่อนไขต้องเป็นจริง)
+    - bigram ภาษาไทยต้องตรงทั้ง token
+    - คำภาษาอังกฤษ/ตัวเลขเป็น prefix
+    """
+    conditions = []
+    seen = set()
+    for run in _RUN_RE.findall((query or "").lower()):
+        if _is_thai(run):
+            for gram in _thai_bigrams(run):
+                key = ("exact", gram)
+                if key not in seen:
+                    seen.add(key)
+                    conditions.append(Q(**{field: gram}))
+        else:
+            key = ("prefix", run[:TOKEN_MAX_LENGTH])
+            if key not in seen:
+                seen.add(key)
+                conditions.append(Q(**{f"{field}__startswith": key[1]}))
+    return conditions[:MAX_QUERY_TOKENS]
+
+
+def search_venues(qs, query):
+    """
+    กรอง queryset ของ Venue ด้วยดัชนีค้นหา และแนบ search_score (ยิ่งมากยิ่งตรง)
+    คืน qs เดิมถ้าคำค้นไม่มี token ที่ใช้ได้
+    """
+    conditions = query_conditions(query)
+    if not conditions:
+        return qs
+
+    # filter ก่อน annotate → aggregate จะนับเฉพาะแถว token ที่ตรงกับคำค้น
+    qs = qs.filter(reduce(or_, conditions))
+    flags = {
+        f"_term_{i}": Max(Case(When(cond, then=1), default=0, output_field=IntegerField()))
+        for i, cond in enumerate(conditions)
+    }
+    return (
+        qs.annotate(search_score=Sum("search_tokens__weight"), **flags)
+        .filter(**{name: 1 for name in flags})
+    )
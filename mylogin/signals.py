@@ -0,0 +1,287 @@
+# mylogin/signals.py
+from collections import Counter
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from mylogin import leaderboards
+from mylogin.availability import invalidate_occupancy
+from mylogin.geo_index import venue_geo_index
+from mylogin.models import (
+    Activity, Booking, CustomUser, Favorite, Review, Venue, VenueAmenity, VenueImage, VenueStats,
+    booking_status_changed,
+)
+from mylogin.search import index_venue
+from mylogin.tasks import enqueue
+from mylogin.thumbnails import delete_thumbnails
+from mylogin.venue_stats import bump_stats
+
+
+# ========================================
+# Venue → geo index ในหน่วยความจำ (หลัง commit เผื่อ transaction ถูก rollback)
+# ========================================
+@receiver(post_save, sender=Venue)
+def venue_saved_update_geo_index(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    venue_id, lat, lng = instance.pk, instance.latitude, instance.longitude
+    transaction.on_commit(lambda: venue_geo_index.upsert(venue_id, lat, lng))
+
+
+@receiver(post_delete, sender=Venue)
+def venue_deleted_update_geo_index(sender, instance, **kwargs):
+    venue_id = instance.pk
+    transaction.on_commit(lambda: venue_geo_index.remove(venue_id))
+
+
+# ========================================
+# Venue → ดัชนีค้นหาข้อความ
+# ========================================
+@receiver(post_save, sender=Venue)
+def venue_saved_update_search_index(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    index_venue(instance)
+
+
+# ========================================
+# Venue ใหม่ → สร้างแถว VenueStats
+# ========================================
+@receiver(post_save, sender=Venue)
+def venue_created_create_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        VenueStats.objects.get_or_create(venue=instance)
+
+
+# ========================================
+# VenueAmenity ถูกลบ → ล้าง bitmask บน Venue (ตอนบันทึก sync อยู่ใน VenueAmenity.save)
+# ========================================
+@receiver(post_delete, sender=VenueAmenity)
+def venue_amenity_deleted_reset_mask(sender, instance, **kwargs):
+    Venue.objects.filter(pk=instance.venue_id).update(amenity_mask=0)
+
+
+# ========================================
+# VenueImage ถูกลบ → ลบ thumbnail ที่ย่อไว้ (หลัง commit เผื่อ transaction ถูก rollback)
+# ========================================
+@receiver(post_delete, sender=VenueImage)
+def venue_image_deleted_remove_thumbnails(sender, instance, **kwargs):
+    image = instance.image
+    transaction.on_commit(lambda: delete_thumbnails(image))
+
+
+# ========================================
+# อัปโหลดรูปใหม่ → ส่งเข้าคิวประมวลผลเบื้องหลัง (manage.py run_worker)
+#   งานถูกเพิ่มใน transaction เดียวกับการบันทึก worker จึงเห็นหลัง commit เท่านั้น
+# ========================================
+_NOT_LOADED = object()
+
+
+def _remember_file(instance, field_name):
+    # ใช้ __dict__ เพื่อไม่ให้ดึงจาก DB เพิ่มถ้าฟิลด์ถูก defer ไว้
+    value = instance.__dict__.get(field_name, _NOT_LOADED)
+    name = value if value is _NOT_LOADED else (getattr(value, "name", value) or "")
+    setattr(instance, f"_loaded_{field_name}", name)
+
+
+def _file_changed(instance, field_name, created, update_fields):
+    if update_fields is not None and field_name not in update_fields:
+        return False
+    current = getattr(instance, field_name).name or ""
+    loaded = "" if created else getattr(instance, f"_loaded_{field_name}", _NOT_LOADED)
+    setattr(instance, f"_loaded_{field_name}", current)
+    return loaded is not _NOT_LOADED and bool(current) and current != loaded
+
+
+@receiver(post_init, sender=VenueImage)
+def venue_image_remember_loaded_file(sender, instance, **kwargs):
+    _remember_file(instance, "image")
+
+
+@receiver(post_save, sender=VenueImage)
+def venue_image_saved_enqueue_processing(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or not _file_changed(instance, "image", created, update_fields):
+        return
+    if not created:
+        VenueImage.objects.filter(pk=instance.pk).update(processing_status="pending", processed_at=None)
+    enqueue("images.process_venue_image", image_id=instance.pk)
+
+
+@receiver(post_init, sender=Booking)
+def booking_remember_loaded_slip(sender, instance, **kwargs):
+    _remember_file(instance, "payment_slip")
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved_enqueue_slip(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or not _file_changed(instance, "payment_slip", created, update_fields):
+        return
+    enqueue("images.normalize_payment_slip", booking_id=instance.pk)
+
+
+@receiver(post_init, sender=CustomUser)
+def user_remember_loaded_bank_qr(sender, instance, **kwargs):
+    _remember_file(instance, "bank_qr")
+
+
+@receiver(post_save, sender=CustomUser)
+def user_saved_enqueue_bank_qr(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or not _file_changed(instance, "bank_qr", created, update_fields):
+        return
+    enqueue("images.process_bank_qr", user_id=instance.pk)
+
+
+# ========================================
+# Booking → ตัวนับ VenueStats + อันดับสถานที่ยอดฮิต (อันดับคำนวณหลัง commit)
+# ========================================
+@receiver(post_init, sender=Booking)
+def booking_remember_loaded_status(sender, instance, **kwargs):
+    # ใช้ __dict__ เพื่อไม่ให้ดึงจาก DB เพิ่มถ้า status ถูก defer ไว้
+    instance._loaded_status = instance.__dict__.get("status")
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved_update_stats(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    was_completed = not created and instance._loaded_status == "completed"
+    is_completed = instance.status == "completed"
+    instance._loaded_status = instance.status
+
+    completed_delta = int(is_completed) - int(was_completed)
+    bump_stats(instance.venue_id, booking_count=int(created), completed_booking_count=completed_delta)
+    if completed_delta:
+        venue_id = instance.venue_id
+        transaction.on_commit(lambda: leaderboards.update_venue_score("completed_booking", venue_id))
+
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted_update_stats(sender, instance, **kwargs):
+    is_completed = instance.status == "completed"
+    bump_stats(instance.venue_id, booking_count=-1, completed_booking_count=-int(is_completed))
+    if is_completed:
+        venue_id = instance.venue_id
+        transaction.on_commit(lambda: leaderboards.update_venue_score("completed_booking", venue_id))
+
+
+# ========================================
+# Booking → ล้าง cache occupancy bitmap รายเดือนของสถานที่ (หลัง commit)
+# ========================================
+@receiver(post_init, sender=Booking)
+def booking_remember_loaded_dates(sender, instance, **kwargs):
+    instance._loaded_dates = (instance.__dict__.get("start_date"), instance.__dict__.get("end_date"))
+
+
+def _invalidate_booking_occupancy(venue_id, *ranges):
+    for start_date, end_date in ranges:
+        if start_date and end_date:
+            transaction.on_commit(lambda s=start_date, e=end_date: invalidate_occupancy(venue_id, s, e))
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved_invalidate_occupancy(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    loaded = instance._loaded_dates
+    instance._loaded_dates = (instance.start_date, instance.end_date)
+    ranges = {loaded, instance._loaded_dates}
+    _invalidate_booking_occupancy(instance.venue_id, *ranges)
+
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted_invalidate_occupancy(sender, instance, **kwargs):
+    _invalidate_booking_occupancy(instance.venue_id, (instance.start_date, instance.end_date))
+
+
+# ========================================
+# Booking.transition_to / bulk_transition (queryset.update ไม่มี post_save)
+#   → ตัวนับ VenueStats, อันดับสถานที่ยอดฮิต และ cache occupancy เหมือนตอน save
+# ========================================
+@receiver(booking_status_changed, sender=Booking)
+def booking_status_changed_update_stats(sender, changes, **kwargs):
+    completed_deltas = Counter()
+    for change in changes:
+        completed_deltas[change.venue_id] += int(change.new_status == "completed") - int(change.old_status == "completed")
+
+    for venue_id, delta in completed_deltas.items():
+        if not delta:
+            continue
+        bump_stats(venue_id, completed_booking_count=delta)
+        transaction.on_commit(lambda venue_id=venue_id: leaderboards.update_venue_score("completed_booking", venue_id))
+
+
+@receiver(booking_status_changed, sender=Booking)
+def booking_status_changed_invalidate_occupancy(sender, changes, **kwargs):
+    for venue_id, start_date, end_date in {(c.venue_id, c.start_date, c.end_date) for c in changes}:
+        _invalidate_booking_occupancy(venue_id, (start_date, end_date))
+
+
+# ========================================
+# Activity → ตัวนับ VenueStats + อันดับสถานที่ยอดฮิต
+# ========================================
+def _booking_venue_id(booking_id):
+    return Booking.objects.filter(pk=booking_id).values_list("venue_id", flat=True).first()
+
+
+@receiver(post_save, sender=Activity)
+def activity_saved_update_stats(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    venue_id = _booking_venue_id(instance.booking_id)
+    bump_stats(venue_id, activity_count=1)
+    if venue_id is not None:
+        transaction.on_commit(lambda: leaderboards.update_venue_score("activity", venue_id))
+
+
+@receiver(post_delete, sender=Activity)
+def activity_deleted_update_stats(sender, instance, **kwargs):
+    venue_id = _booking_venue_id(instance.booking_id)
+    if venue_id is None:
+        # booking ถูกลบไปพร้อมกัน (cascade) → ตัวนับของ venue นั้นจะถูกจัดการตอนลบ venue/booking
+        transaction.on_commit(lambda: leaderboards.refresh_leaderboard("activity"))
+        return
+    bump_stats(venue_id, activity_count=-1)
+    transaction.on_commit(lambda: leaderboards.update_venue_score("activity", venue_id))
+
+
+# ========================================
+# Review → ตัวนับ VenueStats + อันดับสถานที่ยอดฮิต
+# ========================================
+@receiver(post_init, sender=Review)
+def review_remember_loaded_rating(sender, instance, **kwargs):
+    instance._loaded_rating = instance.__dict__.get("rating")
+
+
+@receiver(post_save, sender=Review)
+def review_saved_update_stats(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        bump_stats(instance.venue_id, rating_sum=instance.rating, rating_count=1)
+    else:
+        bump_stats(instance.venue_id, rating_sum=instance.rating - (instance._loaded_rating or 0))
+    instance._loaded_rating = instance.rating
+    venue_id = instance.venue_id
+    transaction.on_commit(lambda: leaderboards.update_venue_score("review", venue_id))
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted_update_stats(sender, instance, **kwargs):
+    bump_stats(instance.venue_id, rating_sum=-instance.rating, rating_count=-1)
+    venue_id = instance.venue_id
+    transaction.on_commit(lambda: leaderboards.update_venue_score("review", venue_id))
+
+
+# ========================================
+# Favorite → ตัวนับ VenueStats
+# ========================================
+@receiver(post_save, sender=Favorite)
+def favorite_saved_update_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        bump_stats(instance.venue_id, favorite_count=1)
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_deleted_update_stats(sender, instance, **kwargs):
+    bump_stats(instance.venue_id, favorite_count=-1)
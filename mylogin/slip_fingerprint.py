@@ -0,0 +1,113 @@
+# mylogin/slip_fingerprint.py
+"""
+ลายนิ้วมือของสลิปโอนเงิน ใช้ตรวจสลิปเดียวกันที่ถูกส่งซ้ำในหลายการจอง
+- slip_sha256: hash ของไฟล์ที่อัปโหลด → ไฟล์เดียวกันเป๊ะ (exact)
+- slip_dhash: difference hash 64 bit ของภาพ → ภาพเดียวกันที่ถูกบีบอัด/ย่อ/ถ่ายหน้าจอใหม่ (near)
+  ถือว่าใกล้กันถ้าต่างกันไม่เกิน NEAR_DUPLICATE_DISTANCE bit
+
+dhash ถูกแบ่งเป็น 4 ช่วง ช่วงละ 16 bit เก็บในคอลัมน์ที่มี index (slip_hash_band0–3)
+ถ้าสอง hash ต่างกันไม่เกิน 3 bit จะต้องมีอย่างน้อยหนึ่งช่วงที่เหมือนกันทุก bit (pigeonhole)
+→ หา candidate ได้ด้วย index แล้วค่อยนับ bit ที่ต่างเฉพาะ candidate ไม่ต้องเทียบรูปทีละคู่
+"""
+import hashlib
+
+from django.db.models import Q
+from PIL import Image, ImageOps
+
+from mylogin.models import Booking
+
+HASH_BANDS = 4
+BAND_BITS = 64 // HASH_BANDS
+NEAR_DUPLICATE_DISTANCE = HASH_BANDS - 1
+
+# จำนวน candidate สูงสุดที่ดึงมาตรวจต่อการอัปโหลดหนึ่งครั้ง
+MAX_CANDIDATES = 50
+
+
+def _to_signed64(value):
+    # BigIntegerField เป็น signed 64 bit
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _to_unsigned64(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+def dhash(fp):
+    """difference hash: ย่อเป็น 9x8 ขาวดำ แล้วเทียบความสว่างของ pixel ที่ติดกันในแนวนอน (คืน int 64 bit)"""
+    with Image.open(fp) as img:
+        img = ImageOps.exif_transpose(img).convert("L").resize((9, 8), Image.Resampling.LANCZOS)
+        pixels = list(img.getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left, right = pixels[row * 9 + col], pixels[row * 9 + col + 1]
+            value = (value << 1) | int(left > right)
+    return value
+
+
+def hash_bands(value):
+    mask = (1 << BAND_BITS) - 1
+    return [(value >> (BAND_BITS * i)) & mask for i in range(HASH_BANDS)]
+
+
+def fingerprint(uploaded):
+    """คืน (sha256 hex, dhash แบบ unsigned) ของไฟล์ที่อัปโหลด (dhash เป็น None ถ้าเปิดเป็นรูปไม่ได้)"""
+    sha = hashlib.sha256()
+    uploaded.seek(0)
+    for chunk in uploaded.chunks():
+        sha.update(chunk)
+    uploaded.seek(0)
+    try:
+        value = dhash(uploaded)
+    except (OSError, ValueError):
+        value = None
+    uploaded.seek(0)
+    return sha.hexdigest(), value
+
+
+def find_duplicate(sha256, dhash_value, exclude_pk=None):
+    """
+    หาการจองอื่นที่ใช้สลิปซ้ำ คืน (booking_id, 'exact' | 'near') หรือ (None, '')
+    - ไฟล์เดียวกันเป๊ะ: ค้นด้วย index ของ slip_sha256 ก่อน (ไม่ปนกับ candidate จาก band
+      สลิปที่ใช้แม่แบบเดียวกันของธนาคารมี band ชนกันได้มาก ถ้ารวมกันจะถูกตัดทิ้งตอนจำกัดจำนวน)
+    - ภาพใกล้กัน: candidate จาก band ไม่เกิน MAX_CANDIDATES รายการ เลือกรายการที่ตรงที่สุด แล้วเก่าสุด
+    """
+    bookings = Booking.objects.all()
+    if exclude_pk is not None:
+        bookings = bookings.exclude(pk=exclude_pk)
+
+    exact_id = bookings.filter(slip_sha256=sha256).order_by("booking_id").values_list("booking_id", flat=True).first()
+    if exact_id is not None:
+        return exact_id, "exact"
+    if dhash_value is None:
+        return None, ""
+
+    condition = Q()
+    for i, band in enumerate(hash_bands(dhash_value)):
+        condition |= Q(**{f"slip_hash_band{i}": band})
+    candidates = bookings.filter(condition).order_by("booking_id").values_list("booking_id", "slip_dhash")[:MAX_CANDIDATES]
+
+    best = None
+    for booking_id, other_dhash in candidates:
+        if other_dhash is None:
+            continue
+        distance = (dhash_value ^ _to_unsigned64(other_dhash)).bit_count()
+        if distance <= NEAR_DUPLICATE_DISTANCE and (best is None or distance < best[1]):
+            best = (booking_id, distance)
+    return (best[0], "near") if best else (None, "")
+
+
+def apply_slip_fingerprint(booking, uploaded):
+    """ตั้งค่าฟิลด์ลายนิ้วมือ + ผลตรวจซ้ำบน booking (ยังไม่ save) คืน (booking_id ที่ซ้ำ, ชนิด)"""
+    sha256, dhash_value = fingerprint(uploaded)
+    duplicate_id, kind = find_duplicate(sha256, dhash_value, exclude_pk=booking.pk)
+
+    booking.slip_sha256 = sha256
+    booking.slip_dhash = _to_signed64(dhash_value) if dhash_value is not None else None
+    bands = hash_bands(dhash_value) if dhash_value is not None else [None] * HASH_BANDS
+    for i, band in enumerate(bands):
+        setattr(booking, f"slip_hash_band{i}", band)
+    booking.slip_duplicate_of_id = duplicate_id
+    booking.slip_duplicate_kind = kind
+    return duplicate_id, kind
@@ -0,0 +1,135 @@
+# mylogin/tasks.py
+"""
+คิวงานเบื้องหลังบนตาราง BackgroundTask
+- @task("ชื่องาน"): ลงทะเบียนฟังก์ชัน (argument ต้องเป็น JSON ได้ เช่น id)
+- enqueue(): เพิ่มงานในคิว — อยู่ใน transaction เดียวกับข้อมูล worker จึงเห็นงานหลัง commit เท่านั้น
+- claim_tasks() / finish_task(): ใช้โดย manage.py run_worker
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from mylogin.models import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+# {ชื่องาน: (ฟังก์ชัน, on_failure)}
+_registry = {}
+
+RETRY_BASE_SECONDS = 30
+
+
+def task(name, on_failure=None):
+    """
+    ลงทะเบียนฟังก์ชันเป็นงานเบื้องหลัง
+    on_failure(**kwargs) จะถูกเรียกเมื่อทำงานไม่สำเร็จครบทุกครั้งที่ลองแล้ว
+    """
+    def decorator(func):
+        _registry[name] = (func, on_failure)
+        return func
+    return decorator
+
+
+def enqueue(name, max_attempts=3, **kwargs):
+    if name not in _registry:
+        raise ValueError(f"unknown task: {name}")
+    return BackgroundTask.objects.create(name=name, kwargs=kwargs, max_attempts=max_attempts)
+
+
+def lock_timeout():
+    """งาน running ที่ค้างนานเกินนี้ (worker ตาย) จะถูกนำกลับเข้าคิว"""
+    return timedelta(seconds=getattr(settings, "TASK_LOCK_TIMEOUT", 600))
+
+
+def claim_tasks(limit):
+    """
+    จองงานที่ถึงเวลาทำ (สูงสุด limit งาน) แล้วเปลี่ยนเป็น running
+    ใช้ SELECT ... FOR UPDATE SKIP LOCKED เพื่อให้รัน worker หลายตัวพร้อมกันได้
+    """
+    now = timezone.now()
+    requeue_stale(now)
+
+    with transaction.atomic():
+        tasks = list(
+            BackgroundTask.objects.select_for_update(skip_locked=True)
+            .filter(status="queued", run_after__lte=now)
+            .order_by("run_after", "id")[:limit]
+        )
+        if tasks:
+            BackgroundTask.objects.filter(pk__in=[t.pk for t in tasks]).update(status="running", locked_at=now)
+    for t in tasks:
+        t.status, t.locked_at = "running", now
+    return tasks
+
+
+def requeue_stale(now=None):
+    """
+    งาน running ที่ค้างนานเกิน lock_timeout() (worker ตาย/โดน OOM kill ระหว่างทำ) นับเป็นการลองหนึ่งครั้งที่ล้มเหลว
+    → กลับเข้าคิวแบบหน่วงเวลา หรือเป็น failed เมื่อลองครบ max_attempts (ไม่งั้นงานที่ทำให้ worker ตายจะถูกลองไม่รู้จบ)
+    """
+    now = now or timezone.now()
+    stale = list(BackgroundTask.objects.filter(status="running", locked_at__lt=now - lock_timeout()))
+    for task_obj in stale:
+        # จองก่อน (compare-and-set บน locked_at) → worker หลายตัวเจองานเดียวกันจะนับครั้งเดียว
+        if not BackgroundTask.objects.filter(pk=task_obj.pk, status="running", locked_at=task_obj.locked_at).update(locked_at=now):
+            continue
+        finish_task(task_obj, f"worker did not finish the task within {lock_timeout()} (process died?)")
+    return len(stale)
+
+
+def execute(name, kwargs):
+    """รันงานหนึ่งงาน (ถูกเรียกใน process ลูกของ worker) คืนข้อความ error หรือ None ถ้าสำเร็จ"""
+    try:
+        func, _ = _registry[name]
+        func(**kwargs)
+    except Exception:
+        return traceback.format_exc()
+    return None
+
+
+def finish_task(task_obj, error=None):
+    """บันทึกผลของงาน — ถ้าล้มเหลวและยังลองไม่ครบ จะกลับเข้าคิวแบบหน่วงเวลาเพิ่มขึ้นเรื่อย ๆ"""
+    now = timezone.now()
+    attempts = task_obj.attempts + 1
+    fields = {"attempts": attempts, "locked_at": None}
+
+    if error is None:
+        fields.update(status="done", finished_at=now, last_error="")
+    elif attempts < task_obj.max_attempts:
+        delay = RETRY_BASE_SECONDS * (2 ** (attempts - 1))
+        fields.update(status="queued", run_after=now + timedelta(seconds=delay), last_error=error)
+        logger.warning("Task %s #%s failed (attempt %d), retry in %ds", task_obj.name, task_obj.pk, attempts, delay)
+    else:
+        fields.update(status="failed", finished_at=now, last_error=error)
+        logger.error("Task %s #%s failed permanently:\n%s", task_obj.name, task_obj.pk, error)
+
+    BackgroundTask.objects.filter(pk=task_obj.pk).update(**fields)
+
+    if fields["status"] == "failed":
+        _, on_failure = _registry.get(task_obj.name, (None, None))
+        if on_failure is not None:
+            try:
+                on_failure(**task_obj.kwargs)
+            except Exception:
+                logger.exception("on_failure of task %s #%s raised", task_obj.name, task_obj.pk)
+
+
+def queue_stats():
+    """จำนวนงานแยกตามสถานะ (แสดงใน adminpanel/runtime-stats)"""
+    return BackgroundTask.objects.aggregate(**{
+        status: Count("id", filter=Q(status=status)) for status, _ in BackgroundTask.STATUS_CHOICES
+    })
+
+
+def prune_finished(days=None):
+    """ลบงานที่จบแล้ว (done/failed) ที่เก่ากว่า TASK_RETENTION_DAYS วัน"""
+    days = days if days is not None else getattr(settings, "TASK_RETENTION_DAYS", 7)
+    deleted, _ = BackgroundTask.objects.filter(
+        status__in=["done", "failed"], finished_at__lt=timezone.now() - timedelta(days=days)
+    ).delete()
+    return deleted
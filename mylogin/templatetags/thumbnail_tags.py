@@ -0,0 +1,15 @@
+# mylogin/templatetags/thumbnail_tags.py
+from django import template
+
+from mylogin.thumbnails import thumbnail_url
+
+register = template.Library()
+
+
+@register.filter
+def thumbnail(fieldfile, size="card"):
+    """
+    {% load thumbnail_tags %}
+    <img src="{{ venue.cover_image.image|thumbnail:'card' }}">
+    """
+    return thumbnail_url(fieldfile, size)
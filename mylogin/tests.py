@@ -1,3 +1,24 @@
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from mylogin.models import Venue
+
+
+class VenueCalendarViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = get_user_model().objects.create_user(email="owner@example.com", password="pw")
+        cls.venue = Venue.objects.create(name="ห้องประชุม", owner=owner)
+
+    def test_impossible_from_date_returns_400(self):
+        response = self.client.get(reverse("venue_calendar", args=[self.venue.pk]), {"from": "2026-02-30"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("error", response.json())
+
+    def test_valid_range_returns_days(self):
+        response = self.client.get(
+            reverse("venue_calendar", args=[self.venue.pk]), {"from": "2026-02-01", "to": "2026-02-03"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["days"]), 3)
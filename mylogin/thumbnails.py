@@ -0,0 +1,111 @@
+# mylogin/thumbnails.py
+"""
+ย่อรูปที่ผู้ใช้อัปโหลด (รูปสถานที่, สลิปโอนเงิน, QR บัญชี) เป็นขนาดคงที่สำหรับแสดงผล
+- สร้างแบบ lazy ตอนถูกขอครั้งแรก แล้วเก็บไว้ใน storage เดิมที่ thumbs/<size>/<ชื่อไฟล์เดิม>.<ext>
+- ครั้งต่อไปเช็คแค่ว่าไฟล์มีอยู่แล้ว (ไม่เปิดรูปต้นฉบับอีก)
+- ถ้าย่อไม่ได้ (ไฟล์หาย/ไม่ใช่รูป) จะคืน URL ของต้นฉบับแทน หน้าเว็บจึงไม่พัง
+"""
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_ROOT = "thumbs"
+
+# ชื่อขนาด → (กว้าง, สูง, crop)
+#   crop=True  ตัดให้เต็มกรอบพอดี (การ์ด/รูปปก)
+#   crop=False ย่อให้อยู่ในกรอบโดยไม่ตัด (QR/สลิป ต้องเห็นครบทั้งรูป)
+THUMBNAIL_SIZES = {
+    "square": (160, 160, True),
+    "card": (640, 360, True),
+    "large": (1280, 720, True),
+    "qr": (480, 480, False),
+    "slip": (720, 1280, False),
+}
+
+THUMBNAIL_QUALITY = 80
+
+
+def _output_format():
+    fmt = getattr(settings, "THUMBNAIL_FORMAT", None)
+    if fmt:
+        return fmt.upper()
+    return "WEBP" if features.check("webp") else "JPEG"
+
+
+def thumbnail_name(name, size):
+    """ชื่อไฟล์ thumbnail ของไฟล์ต้นฉบับ name (เช่น venue_images/a.jpg → thumbs/card/venue_images/a.webp)"""
+    root, _ = os.path.splitext(name)
+    ext = "jpg" if _output_format() == "JPEG" else _output_format().lower()
+    return f"{THUMBNAIL_ROOT}/{size}/{root}.{ext}"
+
+
+def render_thumbnail(fp, size):
+    """ย่อรูปจาก file object → bytes ตามขนาดใน THUMBNAIL_SIZES"""
+    width, height, crop = THUMBNAIL_SIZES[size]
+    fmt = _output_format()
+
+    with Image.open(fp) as img:
+        img = ImageOps.exif_transpose(img)  # รูปจากมือถือมักหมุนด้วย EXIF
+        if fmt == "JPEG" or not img.has_transparency_data:
+            img = img.convert("RGB")
+        elif img.mode != "RGBA":
+            img = img.convert("RGBA")
+
+        if crop:
+            img = ImageOps.fit(img, (width, height), Image.Resampling.LANCZOS)
+        else:
+            img.thumbnail((width, height), Image.Resampling.LANCZOS)
+
+        out = BytesIO()
+        img.save(out, fmt, quality=THUMBNAIL_QUALITY, optimize=True)
+    return out.getvalue()
+
+
+def get_thumbnail(fieldfile, size):
+    """
+    คืนชื่อไฟล์ thumbnail ใน storage (สร้างถ้ายังไม่มี)
+    fieldfile คือ FieldFile ของ ImageField/FileField เช่น venue_image.image
+    """
+    if size not in THUMBNAIL_SIZES:
+        raise ValueError(f"unknown thumbnail size: {size}")
+
+    storage = fieldfile.storage
+    name = thumbnail_name(fieldfile.name, size)
+    if storage.exists(name):
+        return name
+
+    with storage.open(fieldfile.name, "rb") as fp:
+        data = render_thumbnail(fp, size)
+    # ถ้ามีอีก request สร้างไฟล์เดียวกันไปก่อน ใช้ของเดิม
+    if storage.exists(name):
+        return name
+    return storage.save(name, ContentFile(data))
+
+
+def thumbnail_url(fieldfile, size):
+    """URL ของ thumbnail (ใช้ใน template ผ่าน filter |thumbnail) — ถ้าย่อไม่ได้คืน URL ต้นฉบับ"""
+    if not fieldfile:
+        return ""
+    try:
+        return fieldfile.storage.url(get_thumbnail(fieldfile, size))
+    except Exception:
+        logger.warning("Thumbnail %s of %s failed, serving original", size, fieldfile.name, exc_info=True)
+        return fieldfile.url
+
+
+def delete_thumbnails(fieldfile):
+    """ลบ thumbnail ทุกขนาดของไฟล์นี้ (เรียกตอนลบรูปต้นฉบับ)"""
+    if not fieldfile:
+        return
+    for size in THUMBNAIL_SIZES:
+        name = thumbnail_name(fieldfile.name, size)
+        try:
+            fieldfile.storage.delete(name)
+        except OSError:
+            logger.warning("Could not delete thumbnail %s", name, exc_info=True)
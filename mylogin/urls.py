@@ -4,12 +4,12 @@ from django.conf import settings
 from django.conf.urls.static import static
 
 from mylogin.views.activity_views import OwnerActivityAnalyticsView
-from mylogin.views.admin_views import AdminActivityDeleteView, AdminActivityListView, AdminActivityUpdateView, AdminDashboardView, AdminUserDeleteView, AdminUserListView, AdminUserUpdateView, AdminVenueDeleteView, AdminVenueListView, AdminVenueUpdateView
+from mylogin.views.admin_views import AdminActivityDeleteView, AdminActivityListView, AdminActivityUpdateView, AdminDashboardView, AdminRuntimeStatsView, AdminUserDeleteView, AdminUserListView, AdminUserUpdateView, AdminVenueDeleteView, AdminVenueListView, AdminVenueUpdateView
 from mylogin.views.auth_views import PasswordChange
 from mylogin.views.landing_views import LandingView
 from mylogin.views.venue_views import OwnerVenueAnalyticsView
 from .views import FavoriteListView, FavoriteToggleView
-from .views import BookingCreateView, BookingListView, BookingDeleteView
+from .views import BookingCreateView, BookingListView, BookingDeleteView, VenueAvailabilityView, VenueCalendarView
 from .views import ActivityListView, ActivityCreateView, ActivityDetailView, ActivityUpdateView, ActivityDeleteView
 from .views import ReviewCreateView, ReviewUpdateView, ReviewDeleteView
 from .views import  VenueMapView
@@ -32,6 +32,8 @@ urlpatterns = [
     path('venues/my/', views.MyVenueListView.as_view(), name='my_venues'),
     path("venues/map/", VenueMapView.as_view(),name="venue_map"),
     path('venues/<int:venue_id>/favorite/',FavoriteToggleView.as_view(),name='venue_favorite_toggle'),
+    path('venues/<int:pk>/calendar/', VenueCalendarView.as_view(), name='venue_calendar'),
+    path('venues/<int:pk>/availability/', VenueAvailabilityView.as_view(), name='venue_availability'),
     path("owner/venue-analytics/", OwnerVenueAnalyticsView.as_view(), name="owner_venue_analytics"),
     
     path('bookings/', BookingListView.as_view(), name='booking_list'),
@@ -41,6 +43,8 @@ urlpatterns = [
     path('bookings/<int:pk>/confirm-payment/',views.booking_confirm_payment,name='booking_confirm_payment'),
     path('bookings/<int:pk>/reject/',views.booking_reject,name='booking_reject'),
     path('bookings/<int:pk>/cancel/',views.booking_cancel,name='booking_cancel'),
+    path('bookings/bulk-action/', views.booking_bulk_action, name='booking_bulk_action'),
+    path('bookings/export.csv', views.booking_export_csv, name='booking_export_csv'),
     path('owner/bank/add/', views.add_owner_bank, name='add_owner_bank'),
     path('owner/bank/edit/', views.owner_bank_edit, name='edit_owner_bank'),
     
@@ -57,6 +61,7 @@ urlpatterns = [
     
     path('venues/<int:venue_id>/chat/',views.start_venue_chat,name='venue_chat_start'),
     path('chat/thread/<int:pk>/',views.chat_thread_view,name='chat_thread_view'),
+    path('chat/thread/<int:pk>/messages/', views.chat_thread_messages, name='chat_thread_messages'),
     path('chat/history/',views.chat_history,name='chat_history'),
     
     path('venues/<int:venue_id>/reviews/create/',ReviewCreateView.as_view(),name='review_create'),
@@ -66,6 +71,7 @@ urlpatterns = [
     path('favorites/',FavoriteListView.as_view(),name='favorite_list'),
     
     path("adminpanel/", AdminDashboardView.as_view(), name="admin_dashboard"),
+    path("adminpanel/runtime-stats/", AdminRuntimeStatsView.as_view(), name="admin_runtime_stats"),
     path("adminpanel/users/", AdminUserListView.as_view(), name="admin_users_list"),
     path("adminpanel/users/<int:pk>/edit/", AdminUserUpdateView.as_view(), name="admin_users_edit"),
     path("adminpanel/users/<int:pk>/delete/", AdminUserDeleteView.as_view(), name="admin_users_delete"),
@@ -0,0 +1,59 @@
+# mylogin/venue_stats.py
+"""
+ตัวนับสถิติต่อสถานที่ (VenueStats)
+- bump_stats(): บวก/ลบตัวนับแบบ atomic ด้วย F() (เรียกจาก signal ของ Review/Booking/Favorite/Activity)
+- compute_stats(): คำนวณใหม่จากข้อมูลจริงทั้งหมด (ใช้ตอน rebuild / ตรวจค่าเพี้ยน)
+"""
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from mylogin.models import Activity, Booking, Favorite, Review, VenueStats
+
+
+def bump_stats(venue_id, **deltas):
+    """
+    เพิ่ม/ลดตัวนับของสถานที่ เช่น bump_stats(5, rating_sum=4, rating_count=1)
+    ไม่สร้างแถวใหม่ (แถวถูกสร้างตอนสร้าง Venue) เพื่อไม่ชนกับการลบ Venue แบบ cascade
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas or venue_id is None:
+        return
+    VenueStats.objects.filter(venue_id=venue_id).update(
+        updated_at=timezone.now(),
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+
+
+def compute_stats(venue_ids=None):
+    """คืน {venue_id: {field: value}} ที่คำนวณจากตารางจริง (GROUP BY ตารางละ 1 query)"""
+    def scoped(qs, field="venue_id"):
+        return qs.filter(**{f"{field}__in": venue_ids}) if venue_ids is not None else qs
+
+    stats = {}
+
+    def put(venue_id, **values):
+        row = stats.setdefault(venue_id, {field: 0 for field in VenueStats.COUNTER_FIELDS})
+        row.update({k: v or 0 for k, v in values.items()})
+
+    for row in scoped(Review.objects.all()).values("venue_id").annotate(s=Sum("rating"), c=Count("id")).order_by():
+        put(row["venue_id"], rating_sum=row["s"], rating_count=row["c"])
+
+    bookings = (
+        scoped(Booking.objects.all()).values("venue_id")
+        .annotate(c=Count("booking_id"), done=Count("booking_id", filter=Q(status="completed")))
+        .order_by()
+    )
+    for row in bookings:
+        put(row["venue_id"], booking_count=row["c"], completed_booking_count=row["done"])
+
+    for row in scoped(Favorite.objects.all()).values("venue_id").annotate(c=Count("id")).order_by():
+        put(row["venue_id"], favorite_count=row["c"])
+
+    activities = (
+        scoped(Activity.objects.all(), field="booking__venue_id")
+        .values("booking__venue_id").annotate(c=Count("activity_id")).order_by()
+    )
+    for row in activities:
+        put(row["booking__venue_id"], activity_count=row["c"])
+
+    return stats
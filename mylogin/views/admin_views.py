@@ -1,9 +1,15 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.http import JsonResponse
 from django.urls import reverse_lazy
+from django.views import View
 from django.views.generic import TemplateView, ListView, UpdateView, DeleteView
 
+from mylogin.chat_buffer import chat_buffer
+from mylogin.chat_presence import presence
+from mylogin.geo_index import venue_geo_index
 from mylogin.models import Venue, Activity
+from mylogin.tasks import queue_stats
 
 
 User = get_user_model()
@@ -21,6 +27,18 @@ class AdminDashboardView(StaffRequiredMixin, TemplateView):
     template_name = "adminpanel/dashboard.html"
 
 
+class AdminRuntimeStatsView(StaffRequiredMixin, View):
+    """ตัวนับของ cache ในหน่วยความจำ (ค่าของ worker process ที่ตอบ request นี้) และจำนวนงานในคิวเบื้องหลัง"""
+
+    def get(self, request):
+        return JsonResponse({
+            "geo_index": venue_geo_index.stats(),
+            "task_queue": queue_stats(),
+            "chat_writes": chat_buffer.stats(),
+            "chat_presence": presence.stats(),
+        })
+
+
 # ========= USERS =========
 class AdminUserListView(StaffRequiredMixin, ListView):
     model = User
@@ -98,7 +98,7 @@ def home(request):
 def profile_view(request):
     favorites = Favorite.objects.filter(
         user=request.user
-    ).select_related('venue')
+    ).select_related('venue').prefetch_related('venue__images')
 
     return render(request, 'home/profile.html', {
         'favorites': favorites,
@@ -1,8 +1,11 @@
+from datetime import date, timedelta
 from io import BytesIO
 from django.utils import timezone
 from django.contrib.auth import authenticate, login as auth_login, logout as auth_logout, update_session_auth_hash
 from django.forms import HiddenInput
-from django.http import HttpResponse, HttpResponseForbidden
+from django.http import (
+    HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, reverse_lazy
 from mylogin.forms import (
@@ -12,15 +15,24 @@ from mylogin.models import ActivityParticipants, Venue, VenueAmenity, Booking, A
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.cache import never_cache
 from django.contrib import messages
+from django.utils.cache import patch_cache_control
+from django.utils.dateparse import parse_date
+from django.views import View
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView
 from django.db import transaction
 from django.contrib.auth.mixins import LoginRequiredMixin
 from decimal import Decimal
 from django.views.generic import TemplateView
-from django.db.models import F, Q
+from django.db.models import Count, F, Q
 from openlocationcode import openlocationcode as olc
 import qrcode
 from mylogin.utils import _completed_status_value
+from mylogin.pagination import keyset_page
+from mylogin.booking_export import iter_export_rows, owner_export_queryset, stream_csv
+from mylogin.slip_fingerprint import apply_slip_fingerprint
+from mylogin.availability import (
+    busy_intervals, format_minute, free_slots, is_available, lock_venue, month_occupancy, VenueLocked,
+)
 
 
 # ========================================
@@ -38,10 +50,20 @@ class BookingCreateView(LoginRequiredMixin, CreateView):
         self.venue = get_object_or_404(Venue, venue_id=venue_id)
         return super().dispatch(request, *args, **kwargs)
     
-    # GET → ใส่ venue ลง context เพื่อใช้แสดงใน template
+    # GET → ใส่ venue และช่วงเวลาที่ถูกจองแล้วในอีก UPCOMING_DAYS วันลง context
+    UPCOMING_DAYS = 14
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['venue'] = self.venue
+
+        today = timezone.localdate()
+        busy = busy_intervals(self.venue, today, today + timedelta(days=self.UPCOMING_DAYS - 1))
+        context['upcoming_busy'] = [
+            (day, [(format_minute(start), format_minute(end)) for start, end in busy[day]])
+            for day in sorted(busy)
+        ]
+        context['upcoming_days'] = self.UPCOMING_DAYS
         return context
 
     # GET → initial value เริ่มต้นของฟอร์ม (ผูกกับ venue ปัจจุบัน)
@@ -69,28 +91,194 @@ class BookingCreateView(LoginRequiredMixin, CreateView):
         num_days = (form.instance.end_date - form.instance.start_date).days + 1
         form.instance.total_price = num_days * form.instance.venue.price_per_day
 
+        # ล็อก venue → ตรวจช่วงเวลาซ้ำ → บันทึก ใน transaction เดียว
+        # (BookingForm.clean ตรวจไปแล้วแต่ยังไม่ล็อก อีก request อาจบันทึกช่วงเดียวกันในระหว่างนั้น)
+        booking = form.instance
+        try:
+            with transaction.atomic():
+                lock_venue(self.venue)
+                if not is_available(self.venue, booking.start_date, booking.end_date,
+                                    booking.start_time, booking.end_time):
+                    form.add_error(None, "ช่วงเวลานี้มีผู้ใช้อื่นจองสถานที่แล้ว กรุณาเลือกวันหรือเวลาใหม่")
+                    return self.form_invalid(form)
+                response = super().form_valid(form)
+        except VenueLocked:
+            # มีอีก request กำลังจองสถานที่นี้อยู่ (ล็อกไม่ได้) → ให้ผู้ใช้ลองใหม่แทนการรอคิว
+            form.add_error(None, "มีผู้ใช้อื่นกำลังจองสถานที่นี้อยู่ กรุณาลองใหม่อีกครั้ง")
+            return self.form_invalid(form)
+
         messages.success(self.request, "จองสถานที่สำเร็จ")
-        return super().form_valid(form)
+        return response
+
+
+# ========================================
+# VenueCalendarView (ช่วงเวลาว่างของสถานที่ แบบ JSON)
+# ========================================
+class VenueCalendarView(View):
+    """
+    GET /venues/<pk>/calendar/?from=YYYY-MM-DD&to=YYYY-MM-DD
+      - คืนช่วงเวลาว่าง/ไม่ว่างของแต่ละวัน (ค่าเริ่มต้น: วันนี้ + 13 วัน)
+      - ช่วงวันที่ยาวสุด availability.MAX_RANGE_DAYS วัน
+    """
+    DEFAULT_DAYS = 14
+
+    def get(self, request, pk):
+        venue = get_object_or_404(Venue, pk=pk)
+
+        dates = {}
+        for key in ('from', 'to'):
+            raw = request.GET.get(key)
+            try:
+                # parse_date raise ValueError กับวันที่ที่รูปแบบถูกแต่ไม่มีจริง (เช่น 2026-02-30)
+                dates[key] = parse_date(raw) if raw else None
+            except ValueError:
+                dates[key] = None
+            if raw and dates[key] is None:
+                return JsonResponse({"error": "from/to ต้องเป็นวันที่ในรูปแบบ YYYY-MM-DD"}, status=400)
+
+        date_from = dates['from'] or timezone.localdate()
+        date_to = dates['to'] or date_from + timedelta(days=self.DEFAULT_DAYS - 1)
+        try:
+            days = free_slots(venue, date_from, date_to)
+        except ValueError as exc:
+            return JsonResponse({"error": str(exc)}, status=400)
+
+        return JsonResponse({
+            "venue_id": venue.pk,
+            "from": date_from.isoformat(),
+            "to": date_to.isoformat(),
+            "days": [
+                {
+                    "date": day.isoformat(),
+                    "free": [[format_minute(s), format_minute(e)] for s, e in free],
+                    "busy": [[format_minute(s), format_minute(e)] for s, e in busy],
+                }
+                for day, free, busy in days
+            ],
+        })
+
+
+# ========================================
+# VenueAvailabilityView (occupancy bitmap รายเดือน สำหรับปฏิทินเลือกวัน)
+# ========================================
+class VenueAvailabilityView(View):
+    """
+    GET /venues/<pk>/availability/?month=YYYY-MM (ค่าเริ่มต้น: เดือนปัจจุบัน)
+      - days[i] คือ bitmap ของวันที่ i+1: bit h = 1 ถ้าชั่วโมง h:00–h:59 ถูกจองแล้ว
+      - อ่านจาก cache (availability.month_occupancy) ไม่ต้องโหลด Venue
+    """
+    CACHE_SECONDS = 15
+
+    def get(self, request, pk):
+        month_param = request.GET.get('month')
+        if month_param:
+            try:
+                year, month = (int(part) for part in month_param.split('-'))
+                date(year, month, 1)
+            except ValueError:
+                return JsonResponse({"error": "month must be YYYY-MM"}, status=400)
+        else:
+            today = timezone.localdate()
+            year, month = today.year, today.month
+
+        response = JsonResponse({
+            "venue_id": pk,
+            "month": f"{year:04d}-{month:02d}",
+            "hours_per_day": 24,
+            "days": month_occupancy(pk, year, month),
+        })
+        patch_cache_control(response, public=True, max_age=self.CACHE_SECONDS)
+        return response
 
 
 # ========================================
 # BookingListView (รายการจอง)
 # ========================================
-class BookingListView(LoginRequiredMixin, ListView):
-    model = Booking
+class BookingListView(LoginRequiredMixin, TemplateView):
     template_name = 'book/listBooking.html'
-    context_object_name = 'bookings'
+    page_size = 20
 
-    # GET → แสดงรายการจองที่เราจองเอง
-    def get_queryset(self):
-        return Booking.objects.filter(user=self.request.user)
-
-    # GET → เพิ่มรายการจองที่คนอื่นมาจองสถานที่ของเรา (owner_bookings)
+    # GET → รายการที่เราจองเอง (bookings) + รายการที่คนอื่นจองสถานที่ของเรา (owner_bookings)
+    #       แต่ละส่วนแบ่งหน้าแบบ keyset และกรองตามแท็บสถานะแยกกัน (prefix ของพารามิเตอร์: mine_ / rent_)
+    #       จำนวน query คงที่ต่อหน้า: ส่วนละ 2 (นับตามสถานะ + ดึงหน้าปัจจุบัน)
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['owner_bookings'] = Booking.objects.filter(venue__owner=self.request.user)
+        user = self.request.user
+        context['bookings'], context['booking_section'] = self._section(
+            'mine', Booking.objects.filter(user=user).select_related('venue', 'user'),
+        )
+        context['owner_bookings'], context['owner_section'] = self._section(
+            'rent', Booking.objects.filter(venue__owner=user).select_related('venue', 'user'),
+        )
         return context
 
+    def _section(self, prefix, queryset):
+        params = self.request.GET
+        status = params.get(f'{prefix}_status', '')
+        if status not in Booking.TRANSITIONS:
+            status = ''
+
+        counts = dict(queryset.order_by().values_list('status').annotate(n=Count('pk')))
+        if status:
+            queryset = queryset.filter(status=status)
+        page = keyset_page(
+            queryset, self.page_size,
+            after=params.get(f'{prefix}_after'), before=params.get(f'{prefix}_before'),
+        )
+
+        tabs = [('', "ทั้งหมด", sum(counts.values()))]
+        tabs += [(value, label, counts.get(value, 0)) for value, label in Booking.STATUS_CHOICES]
+        section = {
+            'status': status,
+            'tabs': [
+                {'label': label, 'count': count, 'active': value == status,
+                 'url': self._query(prefix, status=value)}
+                for value, label, count in tabs
+            ],
+            'next_url': self._query(prefix, status=status, after=page.next_cursor) if page.next_cursor else None,
+            'prev_url': self._query(prefix, status=status, before=page.prev_cursor) if page.prev_cursor else None,
+        }
+        return page, section
+
+    def _query(self, prefix, **values):
+        """query string ใหม่ที่เปลี่ยนเฉพาะพารามิเตอร์ของส่วน prefix (อีกส่วนคงหน้าเดิมไว้)"""
+        query = self.request.GET.copy()
+        for key in ('status', 'after', 'before'):
+            query.pop(f'{prefix}_{key}', None)
+            if values.get(key):
+                query[f'{prefix}_{key}'] = values[key]
+        return f'?{query.urlencode()}'
+
+
+# ========================================
+# booking_export_csv (เจ้าของส่งออกรายการจองของสถานที่ตัวเองเป็น CSV)
+# ========================================
+@login_required(login_url='login')
+def booking_export_csv(request):
+    """
+    GET /bookings/export.csv?from=YYYY-MM-DD&to=YYYY-MM-DD&status=completed&status=...
+      - ช่วงวันที่เทียบกับวันที่จอง (start_date–end_date) ทุกพารามิเตอร์ไม่บังคับ
+      - ส่งแบบ StreamingHttpResponse อ่านจาก DB ทีละ chunk (ดู mylogin/booking_export.py)
+    """
+    dates = {}
+    for key in ('from', 'to'):
+        raw = request.GET.get(key)
+        try:
+            dates[key] = parse_date(raw) if raw else None
+        except ValueError:
+            dates[key] = None
+        if raw and dates[key] is None:
+            return HttpResponseBadRequest("from/to ต้องอยู่ในรูปแบบ YYYY-MM-DD")
+    statuses = [s for s in request.GET.getlist('status') if s]
+    if any(s not in Booking.TRANSITIONS for s in statuses):
+        return HttpResponseBadRequest("status ไม่ถูกต้อง")
+
+    queryset = owner_export_queryset(request.user, dates['from'], dates['to'], statuses)
+    response = StreamingHttpResponse(stream_csv(iter_export_rows(queryset)), content_type='text/csv; charset=utf-8')
+    filename = f"bookings-{timezone.localdate():%Y%m%d}.csv"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
 
 # ========================================
 # BookingDeleteView (ลบการจอง)
@@ -132,10 +320,10 @@ def booking_approve_initial(request, pk):
         messages.warning(request, "กรุณาเพิ่มข้อมูลบัญชี/QR ก่อนอนุมัติ")
         return redirect('add_owner_bank')
 
-    # อนุมัติการจอง
-    booking.status = 'approved'
-    booking.approved_at = timezone.now()
-    booking.save(update_fields=['status', 'approved_at'])
+    # อนุมัติการจอง (ถ้าสถานะถูกเปลี่ยนไปก่อนแล้ว เช่นผู้จองยกเลิก จะไม่ทับ)
+    if not booking.transition_to('approved'):
+        messages.error(request, "สถานะไม่ถูกต้องสำหรับการอนุมัติ (อาจถูกเปลี่ยนไปแล้ว)")
+        return redirect('booking_list')
 
     messages.success(request, "อนุมัติคำขอแล้ว — ผู้เช่าจะเห็นรายละเอียดการชำระเงิน")
     return redirect('booking_list')
@@ -153,6 +341,7 @@ def booking_upload_slip(request, pk):
       - ตรวจ input: สิทธิ์เป็นผู้จอง, สถานะต้อง approved
       - ตรวจยอดเงินที่จ่าย == total_price
       - บันทึกสลิป, เปลี่ยนสถานะเป็น awaiting_confirmation
+      - เก็บลายนิ้วมือสลิปและตั้งธงถ้าซ้ำกับสลิปของการจองอื่น (แสดงให้เจ้าของเห็นตอนยืนยัน)
     """
     booking = get_object_or_404(Booking, pk=pk)
 
@@ -161,7 +350,7 @@ def booking_upload_slip(request, pk):
         return HttpResponseForbidden("อนุญาตเฉพาะผู้จอง")
 
     # ต้องอยู่ในสถานะ approved เท่านั้นถึงจะอัปโหลดสลิปได้
-    if booking.status != 'approved':
+    if not booking.can_transition('awaiting_confirmation'):
         messages.error(request, "สถานะไม่ถูกต้องสำหรับการอัปโหลดสลิป")
         return redirect('booking_list')
 
@@ -175,10 +364,12 @@ def booking_upload_slip(request, pk):
             if Decimal(amount) != Decimal(required):
                 form.add_error("amount_paid", f"ต้องชำระ {required} บาท (คุณกรอก {amount} บาท)")
             else:
-                form.save()
-                booking.status = 'awaiting_confirmation'
-                booking.slip_uploaded_at = timezone.now()
-                booking.save(update_fields=['status', 'slip_uploaded_at'])
+                with transaction.atomic():
+                    if not booking.transition_to('awaiting_confirmation'):
+                        messages.error(request, "สถานะไม่ถูกต้องสำหรับการอัปโหลดสลิป (อาจถูกเปลี่ยนไปแล้ว)")
+                        return redirect('booking_list')
+                    apply_slip_fingerprint(form.instance, form.cleaned_data["payment_slip"])
+                    form.save()
                 messages.success(request, "อัปโหลดสลิปเรียบร้อย รอเจ้าของตรวจสอบ")
                 return redirect('booking_list')
     else:
@@ -206,7 +397,7 @@ def booking_confirm_payment(request, pk):
         return HttpResponseForbidden("คุณไม่มีสิทธิ์ดำเนินการนี้")
 
     # ต้องอยู่สถานะ awaiting_confirmation
-    if booking.status != 'awaiting_confirmation':
+    if not booking.can_transition('completed'):
         messages.error(request, "สถานะไม่ถูกต้องสำหรับการยืนยันการจอง")
         return redirect('booking_list')
 
@@ -233,9 +424,9 @@ def booking_confirm_payment(request, pk):
         return redirect('booking_list')
 
     # ผ่านทุกเงื่อนไข → ปิดการจองเป็น completed
-    booking.status = 'completed'
-    booking.completed_at = timezone.now()
-    booking.save(update_fields=['status', 'completed_at'])
+    if not booking.transition_to('completed'):
+        messages.error(request, "สถานะไม่ถูกต้องสำหรับการยืนยันการจอง (อาจถูกเปลี่ยนไปแล้ว)")
+        return redirect('booking_list')
     messages.success(request, "ยืนยันการจองเสร็จสมบูรณ์")
     return redirect('booking_list')
 
@@ -254,8 +445,9 @@ def booking_reject(request, pk):
     if not _is_owner(request.user, booking):
         return HttpResponseForbidden("คุณไม่มีสิทธิ์ดำเนินการนี้")
 
-    booking.status = 'rejected'
-    booking.save(update_fields=['status'])
+    if not booking.transition_to('rejected'):
+        messages.error(request, "ไม่สามารถปฏิเสธในสถานะปัจจุบันได้")
+        return redirect('booking_list')
     messages.info(request, "ปฏิเสธคำขอแล้ว")
     return redirect('booking_list')
 
@@ -268,7 +460,7 @@ def booking_cancel(request, pk):
     """
     GET/POST:
       - ผู้จองยกเลิก booking ของตัวเอง
-      - ยกเลิกไม่ได้ถ้าสถานะเป็น completed หรือ cancelled แล้ว
+      - ยกเลิกได้เฉพาะสถานะที่ยังไม่จบ (pending / approved / awaiting_confirmation)
     """
     booking = get_object_or_404(Booking, pk=pk)
 
@@ -276,16 +468,64 @@ def booking_cancel(request, pk):
     if booking.user != request.user:
         return HttpResponseForbidden("อนุญาตเฉพาะผู้จอง")
 
-    # ในสถานะ completed หรือ cancelled แล้ว ห้ามยกเลิกซ้ำ
-    if booking.status in ['completed', 'cancelled']:
+    # ยกเลิกได้เฉพาะสถานะที่ยังไม่จบ (ดู Booking.TRANSITIONS)
+    if not booking.transition_to('cancelled'):
         messages.error(request, "ไม่สามารถยกเลิกในสถานะปัจจุบันได้")
         return redirect('booking_list')
-
-    booking.status = 'cancelled'
-    booking.save(update_fields=['status'])
     messages.info(request, "ยกเลิกแล้ว")
     return redirect('booking_list')
 
+
+# ========================================
+# booking_bulk_action (เจ้าของอนุมัติ/ปฏิเสธ/ยืนยันหลายรายการพร้อมกัน)
+# ========================================
+BULK_ACTIONS = {
+    'approve': ('approved', "อนุมัติ"),
+    'reject': ('rejected', "ปฏิเสธ"),
+    'confirm': ('completed', "ยืนยันการชำระเงิน"),
+}
+
+
+@login_required(login_url='login')
+def booking_bulk_action(request):
+    """
+    POST:
+      - booking_ids = รายการ id ที่เลือก, action = approve / reject / confirm
+      - ใช้ได้เฉพาะ booking ของสถานที่ที่ตัวเองเป็นเจ้าของ
+      - เปลี่ยนสถานะด้วย UPDATE เดียว (Booking.bulk_transition) รายการที่สถานะเปลี่ยนไปแล้วจะถูกข้าม
+      - confirm: เฉพาะรายการที่มีสลิปและยอดที่แจ้งตรงกับ total_price และสลิปไม่ซ้ำกับการจองอื่น
+        (สลิปที่ถูกตั้งธงซ้ำต้องตรวจแล้วยืนยันทีละรายการ)
+    """
+    if request.method != "POST":
+        return redirect('booking_list')
+
+    action = BULK_ACTIONS.get(request.POST.get('action'))
+    ids = [int(pk) for pk in request.POST.getlist('booking_ids') if pk.isdigit()]
+    if action is None or not ids:
+        messages.error(request, "กรุณาเลือกรายการและการดำเนินการ")
+        return redirect('booking_list')
+    new_status, label = action
+
+    if new_status == 'approved' and not (
+        request.user.bank_qr or (request.user.bank_name and request.user.bank_account_number)
+    ):
+        messages.warning(request, "กรุณาเพิ่มข้อมูลบัญชี/QR ก่อนอนุมัติ")
+        return redirect('add_owner_bank')
+
+    qs = Booking.objects.filter(pk__in=ids, venue__owner=request.user)
+    if new_status == 'completed':
+        qs = qs.exclude(Q(payment_slip='') | Q(payment_slip__isnull=True)).filter(
+            amount_paid=F('total_price'), slip_duplicate_kind='',
+        )
+
+    changed = Booking.bulk_transition(qs, new_status)
+    skipped = len(ids) - len(changed)
+    if changed:
+        messages.success(request, f"{label}แล้ว {len(changed)} รายการ")
+    if skipped:
+        messages.warning(request, f"ข้าม {skipped} รายการ (สถานะไม่ถูกต้อง ถูกเปลี่ยนไปแล้ว ข้อมูลการชำระเงินไม่ครบ หรือสลิปซ้ำกับการจองอื่น)")
+    return redirect('booking_list')
+
 @login_required(login_url='login')
 def add_owner_bank(request):
 
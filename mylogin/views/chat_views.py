@@ -1,10 +1,16 @@
 # mylogin/views/chat_views.py
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseForbidden
+from django.http import HttpResponseForbidden, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.db.models import Q
+from django.db.models import Case, F, Q, When
 
-from mylogin.models import Venue, ChatThread, ChatMessage
+from mylogin.chat import HISTORY_PAGE_SIZE, history_page, mark_read, read_fields
+from mylogin.chat_buffer import max_message_length
+from mylogin.chat_presence import TYPING_TIMEOUT
+from mylogin.models import Venue, ChatThread
+from mylogin.pagination import keyset_page
+
+CHAT_INBOX_PAGE_SIZE = 20
 
 
 @login_required
@@ -36,18 +42,20 @@ def chat_thread_view(request, pk):
     """
     แสดงหน้าแชท 1–1 ของ thread นี้
     """
-    thread = get_object_or_404(ChatThread, pk=pk)
+    thread = get_object_or_404(ChatThread.objects.select_related('venue', 'customer', 'owner'), pk=pk)
 
     # ให้เข้าได้เฉพาะ owner กับ customer
     if request.user not in (thread.customer, thread.owner):
         return HttpResponseForbidden("คุณไม่มีสิทธิ์เข้าห้องแชทนี้")
 
-    chat_messages = (
-        ChatMessage.objects
-        .filter(thread=thread)
-        .select_related('sender')
-        .order_by('timestamp')
-    )
+    # ส่งเฉพาะหน้าล่าสุดไปกับหน้าเว็บ (query เดียว) ข้อความเก่ากว่านั้นโหลดเพิ่มตอนเลื่อนขึ้น (chat_thread_messages)
+    chat_messages, older_cursor = history_page(thread.pk)
+
+    # เปิดห้อง = อ่านถึงข้อความล่าสุดแล้ว
+    is_owner = request.user.pk == thread.owner_id
+    if chat_messages:
+        mark_read(thread.pk, is_owner, chat_messages[-1]['id'])
+    other_last_read_field, _ = read_fields(not is_owner)
 
     if request.user == thread.owner:
         other_user = thread.customer
@@ -57,22 +65,57 @@ def chat_thread_view(request, pk):
     return render(request, 'chat/chat.html', {
         'thread': thread,
         'chat_messages': chat_messages,  # 👈 ชื่อ key ใช้ตัวนี้
+        'older_cursor': older_cursor,
+        'other_last_read_id': getattr(thread, other_last_read_field),
+        'typing_timeout_ms': int(TYPING_TIMEOUT * 1000),
+        'max_message_length': max_message_length(),
         'other_user': other_user,
     })
 
 
+@login_required
+def chat_thread_messages(request, pk):
+    """
+    GET /chat/thread/<pk>/messages/?cursor=...&limit=30 (JSON)
+      - ไม่มี cursor → ข้อความล่าสุด, มี cursor → หน้าที่เก่ากว่า
+      - messages เรียงเก่า → ใหม่, next_cursor = null เมื่อถึงข้อความแรกของห้องแล้ว
+    """
+    is_member = ChatThread.objects.filter(pk=pk).filter(
+        Q(customer=request.user) | Q(owner=request.user)
+    ).exists()
+    if not is_member:
+        return JsonResponse({"error": "คุณไม่มีสิทธิ์เข้าห้องแชทนี้"}, status=403)
+
+    try:
+        limit = int(request.GET.get('limit', HISTORY_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({"error": "limit must be an integer"}, status=400)
+
+    chat_messages, next_cursor = history_page(pk, request.GET.get('cursor'), limit)
+    return JsonResponse({"messages": chat_messages, "next_cursor": next_cursor})
+
+
 @login_required
 def chat_history(request):
     """
     แสดงรายการห้องแชททั้งหมดที่ user คนนี้เกี่ยวข้อง
+    - เรียงตามเวลาข้อความล่าสุด แบ่งหน้าแบบ keyset บน updated_at (?after= / ?before=)
+    - ข้อความล่าสุด + unread มากับ query เดียวกัน (ไม่ query ต่อห้อง)
     """
     threads = (
         ChatThread.objects
         .filter(Q(customer=request.user) | Q(owner=request.user))
-        .select_related('venue', 'customer', 'owner')
-        .order_by('-updated_at')
+        .select_related('venue', 'customer', 'owner', 'last_message')
+        .annotate(unread=Case(
+            When(owner=request.user, then=F('owner_unread_count')),
+            default=F('customer_unread_count'),
+        ))
+    )
+    page = keyset_page(
+        threads, CHAT_INBOX_PAGE_SIZE,
+        after=request.GET.get('after'), before=request.GET.get('before'), time_field='updated_at',
     )
 
     return render(request, 'chat/chat_history.html', {
-        'threads': threads,
+        'threads': page,
     })
@@ -1,42 +1,90 @@
 # mylogin/views/landing_views.py
-from math import radians, sin, cos, sqrt, atan2
 from django.views.generic import ListView
-from django.db.models import Count, Avg, Q
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast, NullIf
 from django.utils import timezone
 import logging
-import re
+import math
 
-from mylogin.models import Venue
+import numpy as np
+
+from mylogin.geo import bounding_box
+from mylogin.geo_index import clamp_radius_km, venue_geo_index
+from mylogin.leaderboards import get_leaderboards
+from mylogin.models import Venue, VenueAmenity, VenueStats
+from mylogin.search import search_venues
 
 logger = logging.getLogger(__name__)
 
 
 def _parse_float(val):
-    """Try to convert val to float. Accepts strings with commas and Decimal. Returns None on failure."""
+    """Try to convert val to float. Accepts strings with commas and Decimal. Returns None on failure or nan/inf."""
     if val is None:
         return None
     try:
         s = str(val).strip()
         # allow both comma or dot as decimal separator from various locales/inputs
         s = s.replace(",", ".")
-        return float(s)
+        number = float(s)
     except (ValueError, TypeError):
         return None
+    return number if math.isfinite(number) else None
 
 
-def haversine_km(lat1, lng1, lat2, lng2) -> float:
+def _nearby_stats(venue_ids, box):
+    """
+    (rating_sum, rating_count, completed_booking_count) จาก VenueStats เรียงตรงกับ venue_ids (ไม่มีแถว stats = 0)
+    อ่านด้วยกรอบสี่เหลี่ยมเดียวกับรัศมี ไม่ส่ง venue_ids ไปเป็น IN list
     """
-    คำนวณระยะทางระหว่าง 2 จุด (lat/lng) หน่วย km
+    min_lat, max_lat, min_lng, max_lng = box
+    rows = np.array(list(
+        VenueStats.objects
+        .filter(venue__latitude__range=(min_lat, max_lat), venue__longitude__range=(min_lng, max_lng))
+        .values_list("venue_id", "rating_sum", "rating_count", "completed_booking_count")
+        .order_by("venue_id")
+    ), dtype=np.int64).reshape(-1, 4)
+    stats = np.zeros((len(venue_ids), 3), dtype=np.int64)
+    if len(rows):
+        pos = np.minimum(np.searchsorted(rows[:, 0], venue_ids), len(rows) - 1)
+        found = rows[pos, 0] == venue_ids
+        stats[found] = rows[pos[found], 1:]
+    return stats.T
+
+
+class NearbyVenueList:
     """
-    R = 6371.0
-    lat1, lng1, lat2, lng2 = map(radians, [lat1, lng1, lat2, lng2])
+    ลำดับสถานที่ที่เรียงไว้แล้ว (ใช้แทน queryset ใน Paginator ตอนค้นหาแบบใกล้ฉัน)
+    - เก็บแค่ venue_id + ระยะทาง (ndarray) ที่เรียงไว้ล่วงหน้า
+    - ตอน slice เป็นหน้า ๆ จะดึง Venue จาก DB เฉพาะหน้านั้น แล้วแปะ distance_km ให้ทุกตัว
+    """
+
+    def __init__(self, queryset, venue_ids, distances):
+        self.queryset = queryset
+        self.venue_ids = venue_ids
+        self.distances = distances
+
+    def count(self):
+        return len(self.venue_ids)
+
+    def __len__(self):
+        return len(self.venue_ids)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
 
-    dlat = lat2 - lat1
-    dlng = lng2 - lng1
+        page_ids = [int(vid) for vid in self.venue_ids[key]]
+        page_distances = self.distances[key]
+        venues = self.queryset.in_bulk(page_ids)
 
-    a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlng / 2) ** 2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
-    return R * c
+        page = []
+        for vid, d in zip(page_ids, page_distances):
+            venue = venues.get(vid)
+            if venue is None:
+                continue
+            venue.distance_km = round(float(d), 2)
+            page.append(venue)
+        return page
 
 
 class LandingView(ListView):
@@ -51,24 +99,54 @@ class LandingView(ListView):
     paginate_by = 12
 
     # ====== amenity fields ที่ใช้ใน VenueAmenity ======
-    AMENITY_FIELDS = [
-        "wifi", "parking", "equipment", "sound_system", "projector",
-        "air_conditioning", "seating", "drinking_water", "first_aid", "cctv"
-    ]
+    AMENITY_FIELDS = VenueAmenity.AMENITY_FIELDS
+
+    ORDER_CHOICES = ("distance", "relevance", "rating", "popular", "newest")
+
+
+    def is_near_search(self):
+        return (
+            self.request.GET.get("near") == "1"
+            and _parse_float(self.request.GET.get("lat")) is not None
+            and _parse_float(self.request.GET.get("lng")) is not None
+        )
+
+    def get_search_text(self):
+        """ใช้ q ก่อน ถ้าไม่มีให้รวม province/district เป็นคำค้น"""
+        q = (self.request.GET.get("q") or "").strip()
+        if q:
+            return q
+        province = (self.request.GET.get("province") or "").strip()
+        district = (self.request.GET.get("district") or "").strip()
+        return f"{province} {district}".strip()
+
+    def get_order(self):
+        """
+        order=distance ใช้ได้เฉพาะตอนค้นหาใกล้ฉัน, order=relevance ใช้ได้เฉพาะตอนมีคำค้น
+        ค่าเริ่มต้น: ใกล้ฉัน → distance, มีคำค้น → relevance, นอกนั้น → newest
+        """
+        near = self.is_near_search()
+        searching = bool(self.get_search_text())
+        order = self.request.GET.get("order") or ""
+        if order not in self.ORDER_CHOICES:
+            order = "distance" if near else "relevance" if searching else "newest"
+        if order == "distance" and not near:
+            order = "relevance" if searching else "newest"
+        if order == "relevance" and not searching:
+            order = "newest"
+        return order
 
     def get_queryset(self):
         qs = (
             Venue.objects
-            .select_related("owner")
-            .prefetch_related("images", "reviews", "favorites")
+            .select_related("owner", "stats")
+            .prefetch_related("images")
         )
 
         # ---------- Filters ----------
         min_price = self.request.GET.get("min_price")
         max_price = self.request.GET.get("max_price")
         min_capacity = self.request.GET.get("min_capacity")
-        province = (self.request.GET.get("province") or "").strip()
-        district = (self.request.GET.get("district") or "").strip()
 
         # ราคา
         if min_price:
@@ -89,25 +167,18 @@ class LandingView(ListView):
             except ValueError:
                 pass
 
-        # จังหวัด/อำเภอ จาก address (ค้นหาจาก text ที่ user ใส่ใน `q`)
-        # ถ้ามีพารามิเตอร์ q (เช่น "กรุงเทพ พญาไท") ให้ split และค้นหาจาก address ของ Venue
-        q = (self.request.GET.get("q") or "").strip()
-        if q:
-            # แยกคำตาม whitespace/comma และกรองแบบ AND (ทุกคำต้องอยู่ใน address)
-            tokens = [t for t in re.split(r"[\s,]+", q) if t]
-            for t in tokens:
-                qs = qs.filter(address__icontains=t)
-        else:
-            # ย้อนกลับไปยังการค้นหาแยก province/district ถ้าไม่มี q
-            if province:
-                qs = qs.filter(address__icontains=province)
-            if district:
-                qs = qs.filter(address__icontains=district)
-
-        # สิ่งอำนวยความสะดวก (ต้องมี VenueAmenity ครบ)
-        for field in self.AMENITY_FIELDS:
-            if self.request.GET.get(field) == "1":
-                qs = qs.filter(**{f"venueamenity__{field}": True})
+        # คำค้น (q) หรือ จังหวัด/อำเภอ → ค้นผ่านดัชนีข้อความ (ชื่อ, ที่อยู่, รายละเอียด, สิ่งอำนวยความสะดวกเพิ่มเติม)
+        # ทุกคำต้องพบในสถานที่นั้น และได้ search_score ไว้เรียงตามความตรง
+        search_text = self.get_search_text()
+        if search_text:
+            qs = search_venues(qs, search_text)
+
+        # สิ่งอำนวยความสะดวก (ต้องมีครบทุกข้อที่เลือก) → เช็ค bitmask บน Venue ไม่ต้อง join
+        required = VenueAmenity.mask_for(
+            [f for f in self.AMENITY_FIELDS if self.request.GET.get(f) == "1"]
+        )
+        if required:
+            qs = qs.alias(_amenities=F("amenity_mask").bitand(required)).filter(_amenities=required)
 
         # ใกล้ฉัน (Near me) -> รับ lat/lng จาก JS
         near = self.request.GET.get("near") == "1"
@@ -117,32 +188,55 @@ class LandingView(ListView):
 
         user_lat = _parse_float(lat_raw)
         user_lng = _parse_float(lng_raw)
-        r_km = _parse_float(radius_raw) or 5.0
+        r_km = clamp_radius_km(_parse_float(radius_raw), 5.0)
 
         if near and user_lat is not None and user_lng is not None:
-            # ดึงเฉพาะที่มีพิกัด
-            with_geo = qs.filter(latitude__isnull=False, longitude__isnull=False).values_list("venue_id", "latitude", "longitude")
-
-            allowed_ids = []
-            for vid, vlat_raw, vlng_raw in with_geo:
-                try:
-                    vlat = _parse_float(vlat_raw)
-                    vlng = _parse_float(vlng_raw)
-                    if vlat is None or vlng is None:
-                        continue
-                    d = haversine_km(user_lat, user_lng, vlat, vlng)
-                    if d <= r_km:
-                        allowed_ids.append(vid)
-                except Exception as exc:  # pragma: no cover - defensive
-                    logger.exception("Error computing distance for venue %s: %s", vid, exc)
-                    continue
-
-            # ถ้า allowed_ids ว่าง = ไม่มีสถานที่ในรัศมี จะคืน queryset ว่าง
-            qs = qs.filter(venue_id__in=allowed_ids)
+            # หา venue ในรัศมีจาก geo index ในหน่วยความจำ (ไม่ต้องอ่านพิกัดจาก DB ทุก request)
+            venue_ids, distances = venue_geo_index.nearby(user_lat, user_lng, r_km)
+            if not len(venue_ids):
+                return qs.none()
+
+            # ถ้ามี filter อื่น (ราคา/ความจุ/คำค้น/สิ่งอำนวยความสะดวก) ให้ DB กรองภายในกรอบสี่เหลี่ยมรอบรัศมี
+            # (ใช้ index ของ latitude/longitude ไม่ส่ง id ทั้งหมดในรัศมีไปเป็น IN list) แล้วตัดกับผลจาก geo index
+            box = bounding_box(user_lat, user_lng, r_km)
+            if qs.query.has_filters():
+                min_lat, max_lat, min_lng, max_lng = box
+                allowed = qs.filter(
+                    latitude__range=(min_lat, max_lat), longitude__range=(min_lng, max_lng)
+                ).values_list("venue_id", flat=True)
+                keep = np.isin(venue_ids, np.fromiter(allowed, dtype=np.int64))
+                venue_ids = venue_ids[keep]
+                distances = distances[keep]
+
+            # order=distance (ค่าเริ่มต้น): ใกล้ → ไกล, เสมอกันใช้ venue_id ให้ลำดับคงที่ทุกหน้า
+            # rating/popular: เรียงแบบเดียวกับตอนไม่ได้ค้นหาใกล้ฉัน ด้วยค่าจาก VenueStats
+            # newest: ใหม่ → เก่า (ทุกแบบยังแสดงระยะทางเหมือนเดิม)
+            order_by = self.get_order()
+            if order_by == "distance":
+                order = np.lexsort((venue_ids, distances))
+            elif order_by in ("rating", "popular"):
+                rating_sum, rating_count, completed = _nearby_stats(venue_ids, box)
+                if order_by == "rating":
+                    # คะแนนเฉลี่ยมาก → น้อย (ยังไม่มีรีวิวไว้ท้ายสุด), เสมอกันใช้จำนวนรีวิว แล้ว venue_id ใหม่ → เก่า
+                    avg = np.divide(rating_sum, rating_count, out=np.zeros(len(venue_ids)), where=rating_count > 0)
+                    order = np.lexsort((-venue_ids, -rating_count, -avg, rating_count == 0))
+                else:
+                    order = np.lexsort((-venue_ids, -completed))
+            else:
+                order = np.argsort(-venue_ids, kind="stable")
+
+            return NearbyVenueList(qs, venue_ids[order], distances[order])
 
         # เรียงผลลัพธ์ (ถ้าอยากให้เป็น “ยอดนิยม” เป็น default ก็เปลี่ยนได้)
-        qs = qs.order_by("-venue_id")
-        return qs
+        order = self.get_order()
+        if order == "relevance" and "search_score" in qs.query.annotations:
+            return qs.order_by("-search_score", "-venue_id")
+        if order == "rating":
+            avg_rating = Cast("stats__rating_sum", FloatField()) / NullIf("stats__rating_count", 0)
+            return qs.order_by(avg_rating.desc(nulls_last=True), "-stats__rating_count", "-venue_id")
+        if order == "popular":
+            return qs.order_by("-stats__completed_booking_count", "-venue_id")
+        return qs.order_by("-venue_id")
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
@@ -158,6 +252,7 @@ class LandingView(ListView):
         ctx["radius_km"] = self.request.GET.get("radius_km", "5")
         ctx["lat"] = self.request.GET.get("lat", "")
         ctx["lng"] = self.request.GET.get("lng", "")
+        ctx["order"] = self.get_order()
 
         # amenity selections
         selected_amenities = {f: (self.request.GET.get(f) == "1") for f in self.AMENITY_FIELDS}
@@ -165,35 +260,16 @@ class LandingView(ListView):
         ctx["selected_amenities"] = selected_amenities
 
         # ====== Recommended / Hot places (3 แบบ) ======
-
-        owner_venues = Venue.objects.all()
+        # อ่านจากตารางอันดับที่คำนวณไว้แล้ว (mylogin/leaderboards.py) ไม่ต้อง aggregate ทุก request
+        boards = get_leaderboards()
 
         # 1) ยอดฮิตจากการจองสำเร็จ (Booking.status = completed)
-        ctx["hot_by_completed_booking"] = (
-            owner_venues.annotate(
-                completed_booking_count=Count(
-                    "bookings",
-                    filter=Q(bookings__status="completed")
-                )
-            )
-            .order_by("-completed_booking_count", "-venue_id")[:6]
-        )
+        ctx["hot_by_completed_booking"] = boards["completed_booking"]
 
         # 2) ยอดฮิตจากการใช้ทำกิจกรรมบ่อย (จำนวน Activity)
-        ctx["hot_by_activity"] = (
-            owner_venues.annotate(
-                activity_count=Count("bookings__activity")
-            )
-            .order_by("-activity_count", "-venue_id")[:6]
-        )
+        ctx["hot_by_activity"] = boards["activity"]
 
         # 3) ยอดฮิตจากรีวิว (Avg rating + จำนวนรีวิว)
-        ctx["hot_by_review"] = (
-            owner_venues.annotate(
-                avg_rating=Avg("reviews__rating"),
-                review_count=Count("reviews")
-            )
-            .order_by("-avg_rating", "-review_count", "-venue_id")[:6]
-        )
+        ctx["hot_by_review"] = boards["review"]
 
         return ctx
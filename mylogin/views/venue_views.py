@@ -1,5 +1,6 @@
 from datetime import timedelta
 from io import BytesIO
+import numpy as np
 from pyexpat.errors import messages
 from django.utils import timezone
 from django.contrib.auth import authenticate, login as auth_login, logout as auth_logout, update_session_auth_hash
@@ -9,7 +10,9 @@ from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, reverse_lazy
 from django.views import View
 from mylogin.forms import VenueAmenityForm, VenueForm, VenueImageFormSet
-from mylogin.models import ActivityParticipants, Favorite, Venue, VenueAmenity, Booking, Activity
+from mylogin.geo import bounding_box
+from mylogin.geo_index import clamp_radius_km, venue_geo_index
+from mylogin.models import ActivityParticipants, Favorite, Venue, VenueAmenity, VenueStats, Booking, Activity
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.cache import never_cache
 from django.views.generic import (
@@ -19,6 +22,7 @@ from django.db import transaction
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db.models import F , Sum , Count 
 from django.db.models.functions import TruncDate
+from mylogin.views.landing_views import _parse_float
 
 # ========================================
 # Venue List (แสดงสถานที่ทั้งหมด)
@@ -29,6 +33,14 @@ class VenueListView(ListView):
     context_object_name = 'venues'
     paginate_by = 20
 
+    def get_queryset(self):
+        return (
+            Venue.objects
+            .select_related('owner')
+            .prefetch_related('images')
+            .order_by('-venue_id')
+        )
+
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
 
@@ -49,6 +61,7 @@ class VenueListView(ListView):
 # ========================================
 class VenueDetailView(DetailView):
     model = Venue
+    queryset = Venue.objects.select_related('stats')
     template_name = 'venue/detailVenue.html'
     context_object_name = 'venue'
 
@@ -210,7 +223,7 @@ class MyVenueListView(LoginRequiredMixin, ListView):
 
     # GET → ดึงเฉพาะสถานที่ที่ผู้ใช้เป็นเจ้าของ
     def get_queryset(self):
-        return Venue.objects.filter(owner=self.request.user)
+        return Venue.objects.filter(owner=self.request.user).prefetch_related('images').order_by('-venue_id')
 
 
 # ========================================
@@ -220,6 +233,7 @@ class VenueMapView(TemplateView):
     template_name = "venue/venue_map.html"
 
     # GET → เตรียมข้อมูลสถานที่ทั้งหมดในรูปแบบดิบสำหรับ map
+    #       ถ้าส่ง ?lat=&lng=&radius_km= มา จะแสดงเฉพาะสถานที่ในรัศมี (ใช้ geo index ในหน่วยความจำ)
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
 
@@ -230,7 +244,20 @@ class VenueMapView(TemplateView):
             .order_by("name")
         )
 
-        data = list(qs)
+        lat = _parse_float(self.request.GET.get("lat"))
+        lng = _parse_float(self.request.GET.get("lng"))
+        radius_km = clamp_radius_km(_parse_float(self.request.GET.get("radius_km")), 10.0)
+        if lat is not None and lng is not None:
+            venue_ids, _ = venue_geo_index.nearby(lat, lng, radius_km)
+            # ไม่ส่ง id จาก index เป็น IN (...) ยาว ๆ — ให้ DB กรองด้วยกรอบสี่เหลี่ยมรอบรัศมี แล้วตัดมุมกรอบด้วยผลจาก index
+            min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+            data = list(qs.filter(latitude__range=(min_lat, max_lat), longitude__range=(min_lng, max_lng)))
+            keep = np.isin(np.fromiter((row["id"] for row in data), dtype=np.int64, count=len(data)), venue_ids)
+            data = [row for row, inside in zip(data, keep) if inside]
+            ctx["radius_km"] = radius_km
+        else:
+            data = list(qs)
+
         ctx["venues"] = data
         ctx["venues_count"] = len(data)
 
@@ -317,6 +344,7 @@ class FavoriteListView(LoginRequiredMixin, ListView):
             Favorite.objects
             .filter(user=self.request.user)
             .select_related('venue')
+            .prefetch_related('venue__images')
             .order_by('-created_at')
         )
         
@@ -356,8 +384,11 @@ class OwnerVenueAnalyticsView(LoginRequiredMixin, TemplateView):
         ctx["revenue_delta"] = r_7d - r_prev
         ctx["revenue_pct"] = self._pct_change(float(r_7d), float(r_prev))
 
+        # ตัวนับสะสมต่อสถานที่ (VenueStats) ไม่ต้อง Count join กับ Booking
+        my_stats = VenueStats.objects.filter(venue__owner=owner)
+
         # 3. Totals
-        ctx["total_bookings"] = my_bookings.count()
+        ctx["total_bookings"] = my_stats.aggregate(s=Sum("booking_count"))["s"] or 0
         ctx["total_activities"] = my_activities.count()
         ctx["total_joined"] = my_participations.filter(status="joined").count()
 
@@ -371,7 +402,7 @@ class OwnerVenueAnalyticsView(LoginRequiredMixin, TemplateView):
 
         # 5. Tables
         ctx["bookings_by_status"] = my_bookings.values("status").annotate(count=Count("booking_id")).order_by("-count")
-        ctx["top_venues"] = my_bookings.values("venue__name").annotate(count=Count("booking_id")).order_by("-count")[:5]
+        ctx["top_venues"] = my_stats.filter(booking_count__gt=0).order_by("-booking_count").values("venue__name", count=F("booking_count"))[:5]
         
         return ctx
     
\ No newline at end of file